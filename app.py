@@ -1,41 +1,61 @@
 import gradio as gr
 import os
 from config import Config
-from utils.qa_chain import QAChain
+from utils.tenants import get_tenant_registry
 
 class AccessibilityChatbot:
-    def __init__(self):
-        self.qa_chain = None
-        self.is_initialized = False
+    """Chat handlers shared by every Gradio session.
     
-    def initialize(self):
-        """Initialize the chatbot and knowledge base."""
+    The team is passed in with each event and its QA chain looked up in the
+    tenant registry, so sessions never switch each other's team and evicted
+    knowledge bases aren't kept alive.
+    """
+    
+    def get_qa_chain(self, tenant=None):
+        """Get the QA chain for a team from the shared registry."""
+        return get_tenant_registry().get(tenant or Config.DEFAULT_TENANT)
+    
+    def initialize(self, tenant=None):
+        """Initialize the chatbot and knowledge base for a team."""
         try:
             Config.validate()
-            self.qa_chain = QAChain()
-            success = self.qa_chain.initialize_knowledge_base()
+            success = self.get_qa_chain(tenant).initialize_knowledge_base()
             if success:
-                self.is_initialized = True
                 return "✅ Chatbot initialized successfully!"
             else:
                 return "❌ Failed to initialize knowledge base. Please check if PDFs are in the data/pdfs directory."
         except Exception as e:
             return f"❌ Initialization error: {str(e)}"
     
-    def chat(self, message, history):
-        """Handle chat interactions."""
+    def chat(self, message, history, tenant=None, sources=None, doc_types=None):
+        """Handle chat interactions for a team, optionally scoped to some documents.
+        
+        Yields the updated history as the answer streams in.
+        """
         print("[DEBUG] chat called")
         print(f"[DEBUG] message: {message}")
         print(f"[DEBUG] history (in): {history}")
-        if not self.is_initialized:
-            init_result = self.initialize()
-            if not self.is_initialized:
+        # Also (re)loads a team whose knowledge base was unloaded to make room for others
+        try:
+            qa_chain = self.get_qa_chain(tenant)
+        except Exception as e:
+            result = history + [
+                {"role": "user", "content": message},
+                {"role": "assistant", "content": f"❌ Initialization error: {str(e)}"}
+            ]
+            print(f"[DEBUG] history (out): {result}")
+            yield result
+            return
+        if not qa_chain.is_initialized:
+            init_result = self.initialize(tenant)
+            if not qa_chain.is_initialized:
                 result = history + [
                     {"role": "user", "content": message},
                     {"role": "assistant", "content": init_result}
                 ]
                 print(f"[DEBUG] history (out): {result}")
-                return result
+                yield result
+                return
         
         if not message.strip():
             result = history + [
@@ -43,32 +63,23 @@ class AccessibilityChatbot:
                 {"role": "assistant", "content": "Please ask a question about web accessibility."}
             ]
             print(f"[DEBUG] history (out): {result}")
-            return result
+            yield result
+            return
         
         try:
-            # Check if qa_chain is available
-            if not self.qa_chain:
+            # Stream the answer from the QA chain; the last result carries the sources
+            for result_data in qa_chain.stream_answer(message, sources=sources, doc_types=doc_types):
+                # Format response
+                response = result_data["answer"]
+                if result_data["sources"]:
+                    response += f"\n\n**Sources:** {', '.join(result_data['sources'])}"
+                
                 result = history + [
                     {"role": "user", "content": message},
-                    {"role": "assistant", "content": "❌ Chatbot not properly initialized. Please click 'Initialize' first."}
+                    {"role": "assistant", "content": response}
                 ]
-                print(f"[DEBUG] history (out): {result}")
-                return result
-            
-            # Get answer from QA chain
-            result_data = self.qa_chain.get_answer(message)
-            
-            # Format response
-            response = result_data["answer"]
-            if result_data["sources"]:
-                response += f"\n\n**Sources:** {', '.join(result_data['sources'])}"
-            
-            result = history + [
-                {"role": "user", "content": message},
-                {"role": "assistant", "content": response}
-            ]
+                yield result
             print(f"[DEBUG] history (out): {result}")
-            return result
             
         except ImportError as e:
             error_msg = f"❌ Missing dependency: {str(e)}. Please install required packages: pip install replicate sentence-transformers"
@@ -77,7 +88,7 @@ class AccessibilityChatbot:
                 {"role": "assistant", "content": error_msg}
             ]
             print(f"[DEBUG] history (out): {result}")
-            return result
+            yield result
         except Exception as e:
             error_msg = f"❌ Error processing your message: {str(e)}"
             result = history + [
@@ -85,7 +96,17 @@ class AccessibilityChatbot:
                 {"role": "assistant", "content": error_msg}
             ]
             print(f"[DEBUG] history (out): {result}")
-            return result
+            yield result
+    
+    def get_filter_choices(self, tenant=None):
+        """Get the document names and types a team's questions can be scoped to."""
+        try:
+            qa_chain = self.get_qa_chain(tenant)
+        except Exception:
+            return {"sources": [], "doc_types": []}
+        if not qa_chain.is_initialized:
+            return {"sources": [], "doc_types": []}
+        return qa_chain.get_filter_options()
     
     def clear_chat(self):
         """Clear chat history."""
@@ -93,13 +114,7 @@ class AccessibilityChatbot:
     
     def get_example_questions(self):
         """Get example questions for the interface."""
-        return [
-            "What are the WCAG 2.1 guidelines for color contrast?",
-            "How do I make images accessible?",
-            "What is the proper way to use ARIA labels?",
-            "How can I make forms more accessible?",
-            "What are the requirements for keyboard navigation?"
-        ]
+        return list(Config.FEATURED_QUESTIONS)
 
 def create_interface():
     """Create the Gradio interface."""
@@ -116,8 +131,16 @@ def create_interface():
             interactive=False
         )
         
-        # Initialize button
-        init_btn = gr.Button("Initialize Chatbot", variant="primary")
+        # Team selector and initialize button
+        tenants = get_tenant_registry().list_tenants()
+        with gr.Row():
+            tenant_select = gr.Dropdown(
+                label="Team",
+                choices=tenants,
+                value=Config.DEFAULT_TENANT,
+                visible=len(tenants) > 1
+            )
+            init_btn = gr.Button("Initialize Chatbot", variant="primary")
         
         # Chat interface
         chatbot = gr.Chatbot(
@@ -136,6 +159,19 @@ def create_interface():
             )
             submit_btn = gr.Button("Send", variant="primary", scale=1)
         
+        # Scope questions to particular documents
+        with gr.Row():
+            source_filter = gr.Dropdown(
+                label="Only search these documents",
+                choices=[],
+                multiselect=True
+            )
+            doc_type_filter = gr.Dropdown(
+                label="Only search these document types",
+                choices=[],
+                multiselect=True
+            )
+        
         # Control buttons
         with gr.Row():
             clear_btn = gr.Button("Clear Chat", variant="secondary")
@@ -148,28 +184,54 @@ def create_interface():
             gr.Markdown(f"- {question}")
         
         # Setup event handlers
-        def initialize_chatbot():
-            result = chatbot_instance.initialize()
-            return result
-        
-        def refresh_knowledge_base():
-            if chatbot_instance.qa_chain:
-                success = chatbot_instance.qa_chain.initialize_knowledge_base(force_rebuild=True)
-                if success:
-                    return "✅ Knowledge base refreshed successfully!"
-                else:
-                    return "❌ Failed to refresh knowledge base."
-            return "❌ Chatbot not initialized."
+        def initialize_chatbot(tenant):
+            result = chatbot_instance.initialize(tenant)
+            choices = chatbot_instance.get_filter_choices(tenant)
+            return (
+                result,
+                gr.update(choices=choices["sources"], value=[]),
+                gr.update(choices=choices["doc_types"], value=[])
+            )
+        
+        def switch_team(tenant):
+            # Each team has its own documents, so start over with its filters and an empty chat
+            choices = chatbot_instance.get_filter_choices(tenant)
+            return (
+                [],
+                gr.update(choices=choices["sources"], value=[]),
+                gr.update(choices=choices["doc_types"], value=[])
+            )
+        
+        def refresh_knowledge_base(tenant):
+            qa_chain = chatbot_instance.get_qa_chain(tenant)
+            if not qa_chain.is_initialized:
+                yield "❌ Chatbot not initialized."
+                return
+            job = qa_chain.refresh_knowledge_base()
+            if not job:
+                yield "❌ Failed to refresh knowledge base."
+                return
+            # The rebuild runs in the background and questions keep working; this only reports progress
+            while not job.wait(timeout=1):
+                yield job.describe()
+            yield job.describe()
         
         # Event bindings
         init_btn.click(
             initialize_chatbot,
-            outputs=[status]
+            inputs=[tenant_select],
+            outputs=[status, source_filter, doc_type_filter]
+        )
+        
+        tenant_select.change(
+            switch_team,
+            inputs=[tenant_select],
+            outputs=[chatbot, source_filter, doc_type_filter]
         )
         
         submit_btn.click(
             chatbot_instance.chat,
-            inputs=[msg, chatbot],
+            inputs=[msg, chatbot, tenant_select, source_filter, doc_type_filter],
             outputs=[chatbot]
         ).then(
             lambda: "",
@@ -178,7 +240,7 @@ def create_interface():
         
         msg.submit(
             chatbot_instance.chat,
-            inputs=[msg, chatbot],
+            inputs=[msg, chatbot, tenant_select, source_filter, doc_type_filter],
             outputs=[chatbot]
         ).then(
             lambda: "",
@@ -192,6 +254,7 @@ def create_interface():
         
         refresh_btn.click(
             refresh_knowledge_base,
+            inputs=[tenant_select],
             outputs=[status]
         )
     
@@ -21,19 +21,78 @@ class Config:
     
     # Model Configuration
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Using sentence-transformers model
+    EMBEDDING_BATCH_SIZE = 64
     CHAT_MODEL = "deepseek-ai/deepseek-r1"
     
+    # LLM Backend Configuration
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "replicate")  # "replicate" or "local"
+    LLM_FALLBACK_BACKEND = os.getenv("LLM_FALLBACK_BACKEND", "")  # e.g. "local" to fail over from Replicate
+    LLM_TEMPERATURE = 0.1
+    LLM_MAX_TOKENS = 1000
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))  # seconds
+    LLM_FIRST_CHUNK_TIMEOUT = float(os.getenv("LLM_FIRST_CHUNK_TIMEOUT", "30"))  # seconds until streaming must start
+    LLM_CONNECT_TIMEOUT = 10.0
+    LLM_MAX_CONNECTIONS = 10
+    LLM_MAX_RETRIES = 2
+    LLM_RETRY_BASE_DELAY = 1.0
+    LLM_RETRY_MAX_DELAY = 10.0
+    LLM_CIRCUIT_FAILURE_THRESHOLD = 5
+    LLM_CIRCUIT_RESET_SECONDS = 60
+    
+    # Local OpenAI-compatible server (vLLM, llama.cpp, Ollama, or a mock)
+    LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "http://localhost:8000/v1")
+    LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "deepseek-r1")
+    LOCAL_LLM_API_KEY = os.getenv("LOCAL_LLM_API_KEY", "")
+    
     # ChromaDB Configuration
     CHROMA_DB_PATH = "./chroma_db"
+    # Loaded Chroma indexes are evicted least-recently-used past this size, across every team
+    CHROMA_MEMORY_LIMIT_BYTES = int(os.getenv("CHROMA_MEMORY_LIMIT_BYTES", str(2 * 1024 ** 3)))
     COLLECTION_NAME = "accessibility_docs"
     
+    # Multi-tenant Configuration: each subdirectory of TENANTS_DIRECTORY is a team's PDF set
+    DEFAULT_TENANT = "default"  # served from COLLECTION_NAME and PDF_DIRECTORY
+    TENANTS_DIRECTORY = "./data/tenants"
+    MAX_LOADED_TENANTS = 4
+    TENANT_MAX_CONCURRENT_LLM_CALLS = 2
+    TENANT_LLM_CALLS_PER_MINUTE = 30
+    TENANT_QUEUE_TIMEOUT = 30.0  # seconds to wait for a free LLM slot before rejecting
+    LLM_INPUT_COST_PER_1K_TOKENS = 0.00375  # estimates for cost counters; match your provider's pricing
+    LLM_OUTPUT_COST_PER_1K_TOKENS = 0.01
+    
     # PDF Processing Configuration
     PDF_DIRECTORY = "./data/pdfs"
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
     
+    # Watch PDF_DIRECTORY and ingest added/modified/deleted PDFs automatically
+    WATCH_PDF_DIRECTORY = os.getenv("WATCH_PDF_DIRECTORY", "false").lower() == "true"
+    WATCH_POLL_SECONDS = 2.0
+    WATCH_DEBOUNCE_SECONDS = 5.0
+    WATCH_RETRY_MAX_SECONDS = 300.0  # failed ingests are retried with exponential backoff up to this
+    WATCH_COMPACT_DEAD_FRACTION = 0.5  # rebuild once this share of stored chunk text belongs to replaced/deleted PDFs
+    
     # Retrieval Configuration
     TOP_K_DOCUMENTS = 5
+    RETRIEVAL_MODE = "mmr"  # "mmr" for diverse results, "similarity" for plain nearest neighbours
+    MMR_FETCH_K = 20  # candidates fetched before MMR picks TOP_K_DOCUMENTS of them
+    MMR_LAMBDA = 0.5  # 1.0 = pure relevance, 0.0 = maximum diversity
+    
+    # Featured questions, answered ahead of time after the knowledge base is built (default team)
+    FEATURED_QUESTIONS = [
+        "What are the WCAG 2.1 guidelines for color contrast?",
+        "How do I make images accessible?",
+        "What is the proper way to use ARIA labels?",
+        "How can I make forms more accessible?",
+        "What are the requirements for keyboard navigation?"
+    ]
+    FEATURED_QUESTIONS_FILENAME = "featured_questions.json"  # a team's own list, kept in its PDF folder
+    WARM_FEATURED_ANSWERS = True
+    FEATURED_ANSWERS_PATH = os.path.join(CHROMA_DB_PATH, "featured_answers.json")
+    
+    # Retrieval sweep tool (python -m utils.retrieval_sweep)
+    SWEEP_QUESTIONS_PATH = "./data/eval/questions.json"
+    SWEEP_CACHE_DIR = "./.cache/retrieval_sweep"
     
     # UI Configuration
     APP_TITLE = "Web Accessibility Q&A Chatbot"
@@ -41,6 +100,7 @@ class Config:
     
     @classmethod
     def validate(cls):
-        if not cls.REPLICATE_API_TOKEN:
+        uses_replicate = "replicate" in (cls.LLM_BACKEND, cls.LLM_FALLBACK_BACKEND)
+        if uses_replicate and not cls.REPLICATE_API_TOKEN:
             raise ValueError("REPLICATE_API_TOKEN environment variable is required")
         return True
\ No newline at end of file
@@ -9,25 +9,25 @@ except ImportError:
 import streamlit as st
 import os
 from config import Config
-from utils.qa_chain import QAChain
+from utils.tenants import get_tenant_registry
 
 def initialize_session_state():
     """Initialize session state variables."""
-    if 'qa_chain' not in st.session_state:
-        st.session_state.qa_chain = None
     if 'is_initialized' not in st.session_state:
         st.session_state.is_initialized = False
     if 'messages' not in st.session_state:
         st.session_state.messages = []
     if 'message_reasoning' not in st.session_state:
         st.session_state.message_reasoning = {}
+    if 'tenant' not in st.session_state:
+        st.session_state.tenant = Config.DEFAULT_TENANT
 
 def initialize_chatbot():
     """Initialize the chatbot and knowledge base."""
     try:
         Config.validate()
-        st.session_state.qa_chain = QAChain()
-        success = st.session_state.qa_chain.initialize_knowledge_base()
+        # Knowledge bases are shared across sessions and loaded per team
+        success = get_tenant_registry().get(st.session_state.tenant).initialize_knowledge_base()
         if success:
             st.session_state.is_initialized = True
             return "✅ Chatbot initialized successfully!"
@@ -36,12 +36,26 @@ def initialize_chatbot():
     except Exception as e:
         return f"❌ Initialization error: {str(e)}"
 
+def get_qa_chain():
+    """Get the QA chain for this session's team, or None before initialization.
+    
+    Only the team name is kept in session state, so a knowledge base the
+    registry unloads is really freed; it is reloaded here when next needed.
+    """
+    if not st.session_state.is_initialized:
+        return None
+    qa_chain = get_tenant_registry().get(st.session_state.tenant)
+    if not qa_chain.is_initialized:
+        qa_chain.initialize_knowledge_base()
+    return qa_chain
+
 def refresh_knowledge_base():
-    """Refresh the knowledge base."""
-    if st.session_state.qa_chain:
-        success = st.session_state.qa_chain.initialize_knowledge_base(force_rebuild=True)
-        if success:
-            return "✅ Knowledge base refreshed successfully!"
+    """Start refreshing the knowledge base in the background."""
+    qa_chain = get_qa_chain()
+    if qa_chain:
+        job = qa_chain.refresh_knowledge_base()
+        if job:
+            return job.describe()
         else:
             return "❌ Failed to refresh knowledge base."
     return "❌ Chatbot not initialized."
@@ -81,15 +95,11 @@ def get_casual_response(message):
     else:
         return "I'm here to help with web accessibility questions. Try asking about WCAG guidelines, ARIA labels, keyboard navigation, or color contrast!"
 
-def get_example_questions():
-    """Get example questions for the interface."""
-    return [
-        "What are the WCAG 2.1 guidelines for color contrast?",
-        "How do I make images accessible?",
-        "What is the proper way to use ARIA labels?",
-        "How can I make forms more accessible?",
-        "What are the requirements for keyboard navigation?"
-    ]
+def get_example_questions(qa_chain=None):
+    """Get example questions for the interface (the team's featured questions once loaded)."""
+    if qa_chain:
+        return list(qa_chain.featured_questions)
+    return list(Config.FEATURED_QUESTIONS)
 
 def main():
     """Main Streamlit application."""
@@ -111,6 +121,16 @@ def main():
     with st.sidebar:
         st.header("Controls")
         
+        # Team selector, shown when more than one team's documents are deployed
+        tenants = get_tenant_registry().list_tenants()
+        if len(tenants) > 1:
+            tenant = st.selectbox("Team", tenants, index=tenants.index(st.session_state.tenant)
+                                  if st.session_state.tenant in tenants else 0)
+            if tenant != st.session_state.tenant:
+                st.session_state.tenant = tenant
+                st.session_state.is_initialized = False
+                clear_chat()
+        
         # Initialize button
         if st.button("Initialize Chatbot", type="primary"):
             with st.spinner("Initializing chatbot..."):
@@ -120,6 +140,8 @@ def main():
                 else:
                     st.error(result)
         
+        qa_chain = get_qa_chain()
+        
         # Status indicator
         status_color = "🟢" if st.session_state.is_initialized else "🔴"
         status_text = "Ready" if st.session_state.is_initialized else "Not initialized"
@@ -136,18 +158,62 @@ def main():
         
         with col2:
             if st.button("Refresh KB"):
-                with st.spinner("Refreshing knowledge base..."):
-                    result = refresh_knowledge_base()
-                    if "✅" in result:
-                        st.success(result)
-                    else:
-                        st.error(result)
+                result = refresh_knowledge_base()
+                if "❌" in result:
+                    st.error(result)
+        
+        # Background refresh progress; questions keep using the current knowledge base meanwhile
+        job = qa_chain.get_refresh_job() if qa_chain else None
+        if job:
+            if job.is_running:
+                st.progress(job.fraction, text=job.describe())
+                if st.button("Update progress"):
+                    st.rerun()
+            elif job.state == "failed":
+                st.error(job.describe())
+            else:
+                st.success(job.describe())
+        
+        # Automatic ingestion of new PDFs (WATCH_PDF_DIRECTORY)
+        watcher_metrics = qa_chain.get_watcher_metrics() if qa_chain else None
+        if watcher_metrics:
+            st.caption(
+                f"📥 Watching PDFs: {watcher_metrics['queue_depth']} queued, "
+                f"lag {watcher_metrics['lag_seconds']:.0f}s, "
+                f"{watcher_metrics['files_ingested']} ingested"
+            )
+        
+        # Per-team LLM usage
+        usage = get_tenant_registry().get_stats().get(st.session_state.tenant)
+        if usage:
+            st.caption(
+                f"📊 {usage['calls']} LLM calls, avg {usage['avg_latency_seconds']:.1f}s, "
+                f"~${usage['estimated_cost_usd']:.2f} estimated"
+            )
         
         st.divider()
         
+        # Scope questions to particular documents
+        if qa_chain:
+            st.header("📂 Search Scope")
+            filter_options = qa_chain.get_filter_options()
+            st.multiselect(
+                "Only search these documents",
+                filter_options["sources"],
+                key="scope_sources"
+            )
+            st.multiselect(
+                "Only search these document types",
+                filter_options["doc_types"],
+                key="scope_doc_types"
+            )
+            
+            st.divider()
+        
         # Example questions
-        st.header("💡 Quick Start")
-        example_questions = get_example_questions()
+        example_questions = get_example_questions(qa_chain)
+        if example_questions:
+            st.header("💡 Quick Start")
         for i, question in enumerate(example_questions):
             # Create shorter, cleaner button text
             if "WCAG" in question:
@@ -201,37 +267,25 @@ def main():
         # Show chat input at the bottom
         prompt = st.chat_input("Ask a question about web accessibility...")
         if prompt:
-            # Show user message immediately
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            
-            # Display the user message right away
-            with st.chat_message("user"):
-                st.markdown(prompt)
-            
-            # Generate and show assistant response
-            with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    assistant_response = generate_response(prompt)
-                    
-                    # Show the complete response once generated
-                    if assistant_response.get("reasoning"):
-                        with st.expander("🧠 Reasoning", expanded=False):
-                            st.markdown(assistant_response["reasoning"])
-                    
-                    st.markdown(assistant_response["content"])
-            
-            # Add assistant response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": assistant_response["content"]})
-            
-            # Store reasoning if present
-            if assistant_response.get("reasoning"):
-                message_index = len(st.session_state.messages) - 1
-                st.session_state.message_reasoning[str(message_index)] = assistant_response["reasoning"]
-            
-            st.rerun()
+            process_new_message(prompt)
+
+def split_reasoning(full_response):
+    """Separate DeepSeek's <think> reasoning from the answer; works on partial responses too."""
+    if "<think>" not in full_response:
+        return "", full_response
+    start_idx = full_response.find("<think>")
+    if "</think>" not in full_response:
+        # Still thinking
+        return full_response[start_idx + len("<think>"):].strip(), ""
+    end_idx = full_response.find("</think>")
+    thinking_content = full_response[start_idx + len("<think>"):end_idx].strip()
+    return thinking_content, full_response[end_idx + len("</think>"):].strip()
 
-def generate_response(prompt):
-    """Generate assistant response and return structured data."""
+def generate_response(prompt, placeholder=None):
+    """Generate assistant response and return structured data.
+    
+    If a placeholder is given, the answer is written into it as it streams in.
+    """
     try:
         # Check if it's a casual input/greeting
         if is_greeting_or_casual(prompt):
@@ -240,34 +294,27 @@ def generate_response(prompt):
                 "reasoning": None
             }
         else:
-            # Get answer from QA chain for accessibility questions
-            result_data = st.session_state.qa_chain.get_answer(prompt)
+            # Stream the answer from the QA chain; the last result carries the sources
+            for result_data in get_qa_chain().stream_answer(
+                prompt,
+                sources=st.session_state.get("scope_sources"),
+                doc_types=st.session_state.get("scope_doc_types")
+            ):
+                if placeholder is not None:
+                    _, partial_answer = split_reasoning(result_data["answer"])
+                    placeholder.markdown(partial_answer or "🧠 Thinking...")
             
             # Parse DeepSeek response to separate thinking from answer
-            full_response = result_data["answer"]
-            thinking_content = ""
-            main_answer = full_response
-            
-            # Check if response contains <think> tags
-            if "<think>" in full_response and "</think>" in full_response:
-                start_idx = full_response.find("<think>")
-                end_idx = full_response.find("</think>") + len("</think>")
-                thinking_content = full_response[start_idx:end_idx]
-                main_answer = full_response[end_idx:].strip()
+            thinking_content, main_answer = split_reasoning(result_data["answer"])
             
             # Format clean response
             response = main_answer
             if result_data["sources"]:
                 response += f"\n\n**Sources:** {', '.join(result_data['sources'])}"
             
-            # Prepare reasoning content
-            reasoning = None
-            if thinking_content:
-                reasoning = thinking_content.replace("<think>", "").replace("</think>", "").strip()
-            
             return {
                 "content": response,
-                "reasoning": reasoning
+                "reasoning": thinking_content or None
             }
         
     except Exception as e:
@@ -277,12 +324,17 @@ def generate_response(prompt):
         }
 
 def process_new_message(prompt):
-    """Process a new user message and generate response (for example questions)."""
-    # Add user message to chat history
+    """Process a new user message and stream the response (typed or example questions)."""
+    # Add user message to chat history and display it right away
     st.session_state.messages.append({"role": "user", "content": prompt})
+    with st.chat_message("user"):
+        st.markdown(prompt)
     
-    # Generate assistant response
-    assistant_response = generate_response(prompt)
+    # Generate and show assistant response as it streams in
+    with st.chat_message("assistant"):
+        placeholder = st.empty()
+        placeholder.markdown("Thinking...")
+        assistant_response = generate_response(prompt, placeholder)
     
     # Add assistant response to chat history
     st.session_state.messages.append({"role": "assistant", "content": assistant_response["content"]})
@@ -0,0 +1,45 @@
+from utils.chunk_store import ChunkStore
+
+
+def test_round_trip_and_reopen(tmp_path):
+    store = ChunkStore("kb", str(tmp_path))
+    assert store.append(["first chunk", "zweiter Abschnitt ✓"], ["a.pdf", "b.pdf"]) == [0, 1]
+    assert store.append(["third"], ["a.pdf"]) == [2]
+    store.close()
+
+    reopened = ChunkStore("kb", str(tmp_path))
+    assert len(reopened) == 3
+    assert reopened.get_text(1) == "zweiter Abschnitt ✓"
+    assert reopened.get_source(2) == "a.pdf"
+    assert reopened.get_source(0) is reopened.get_source(2)
+
+
+def test_reset_removes_everything(tmp_path):
+    store = ChunkStore("kb", str(tmp_path))
+    store.append(["text"], ["a.pdf"])
+    store.reset()
+    assert len(store) == 0
+    assert len(ChunkStore("kb", str(tmp_path))) == 0
+
+
+def test_recovers_from_interrupted_append(tmp_path):
+    store = ChunkStore("kb", str(tmp_path))
+    store.append(["kept"], ["a.pdf"])
+    store.append(["lost"], ["a.pdf"])
+    store.close()
+
+    # Crash mid-write: the last chunk's text never reached the blob and half an index entry was written
+    with open(store.blob_path, 'r+b') as file:
+        file.truncate(len("kept"))
+    with open(store.index_path, 'ab') as file:
+        file.write(b"\x01\x02\x03")
+
+    recovered = ChunkStore("kb", str(tmp_path))
+    assert len(recovered) == 1
+    assert recovered.append(["after"], ["b.pdf"]) == [1]
+    recovered.close()
+
+    reopened = ChunkStore("kb", str(tmp_path))
+    assert len(reopened) == 2
+    assert [reopened.get_text(0), reopened.get_text(1)] == ["kept", "after"]
+    assert reopened.get_source(1) == "b.pdf"
@@ -0,0 +1,36 @@
+import os
+from utils.featured_answers import FeaturedAnswerStore, load_featured_questions
+
+ANSWER = {"answer": "Use a contrast ratio of at least 4.5:1.", "sources": [], "error": None}
+
+
+def test_stored_answer_is_ignored_once_the_index_changes(tmp_path):
+    store = FeaturedAnswerStore(str(tmp_path / "featured.json"))
+    store.save("v1", {"What about color contrast?": ANSWER})
+
+    assert store.get("what about  color contrast", "v1") == ANSWER
+    assert store.get("What about color contrast?", "v2") is None
+    assert not store.has_all(["What about color contrast?"], "v2")
+
+
+def test_answers_written_by_another_process_are_reloaded(tmp_path):
+    path = str(tmp_path / "featured.json")
+    reader = FeaturedAnswerStore(path)
+    FeaturedAnswerStore(path).save("v1", {"What about color contrast?": ANSWER})
+    assert reader.get("What about color contrast?", "v1") == ANSWER
+
+    FeaturedAnswerStore(path).save("v2", {"How do I label forms?": ANSWER})
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))  # coarse mtimes could otherwise hide the rewrite
+
+    assert reader.get("What about color contrast?", "v1") is None
+    assert reader.get("How do I label forms?", "v2") == ANSWER
+
+
+def test_missing_or_invalid_questions_file_gives_no_questions(tmp_path):
+    path = tmp_path / "featured_questions.json"
+    assert load_featured_questions(str(path)) == []
+    path.write_text('{"question": "not a list"}')
+    assert load_featured_questions(str(path)) == []
+    path.write_text('["  How do I caption videos? ", "", 3]')
+    assert load_featured_questions(str(path)) == ["How do I caption videos?"]
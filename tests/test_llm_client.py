@@ -0,0 +1,143 @@
+import threading
+import time
+import pytest
+from utils.llm_client import CircuitBreaker, CircuitOpenError, FailoverLLMClient, LLMClient, LLMError
+
+
+class FakeClient(LLMClient):
+    name = "fake"
+
+    def __init__(self, chunks=("Hello", " world"), error=None, delay=0.0, retryable=True, **kwargs):
+        kwargs.setdefault("max_retries", 0)
+        super().__init__(**kwargs)
+        self.chunks = chunks
+        self.error = error
+        self.delay = delay
+        self.retryable = retryable
+        self.calls = 0
+
+    def _complete(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return "".join(self.chunks)
+
+    def _stream(self, prompt, cancel):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        yield from self.chunks
+
+    def _is_retryable(self, error):
+        return self.retryable
+
+
+def test_breaker_opens_after_threshold_and_probes_once():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow()
+
+
+def test_open_circuit_rejects_calls():
+    client = FakeClient(error=ConnectionError("refused"))
+    client.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    with pytest.raises(LLMError):
+        client.generate("q")
+    with pytest.raises(CircuitOpenError):
+        client.generate("q")
+
+
+def test_non_retryable_errors_do_not_open_the_circuit():
+    client = FakeClient(error=ValueError("bad input"), retryable=False, max_retries=2)
+    client.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    for _ in range(5):
+        with pytest.raises(LLMError):
+            client.generate("q")
+    assert not client.breaker.is_open
+    assert client.calls == 5
+
+
+def test_abandoned_stream_ends_half_open_probe():
+    client = FakeClient()
+    client.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    client.breaker.record_failure()
+    time.sleep(0.02)
+
+    stream = client.stream("q")
+    assert next(stream) == "Hello"
+    stream.close()
+    assert client.breaker.allow()
+
+
+def test_slow_first_chunk_fails_over_without_retrying():
+    slow = CancellableClient(delay=1.0, first_chunk_timeout=0.05, max_retries=2)
+    client = FailoverLLMClient(slow, FakeClient(chunks=("fallback",)))
+
+    started = time.monotonic()
+    assert list(client.stream("q")) == ["fallback"]
+    assert time.monotonic() - started < 0.5
+    assert slow.calls == 1
+    assert slow.cancelled == 1
+    assert slow.closed.wait(1)
+
+
+class CancellableClient(FakeClient):
+    """Waits for its first chunk until cancelled, like a backend with a long queue."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.cancelled = 0
+        self.closed = threading.Event()
+
+    def _stream(self, prompt, cancel):
+        self.calls += 1
+        stop = threading.Event()
+
+        def on_cancel():
+            self.cancelled += 1
+            stop.set()
+
+        cancel.add(on_cancel)
+        try:
+            for chunk in self.chunks:
+                if stop.wait(self.delay):
+                    return
+                yield chunk
+        finally:
+            self.closed.set()
+
+
+def test_timed_out_stream_is_cancelled_before_retrying():
+    client = CancellableClient(delay=1.0, first_chunk_timeout=0.05, max_retries=2)
+    with pytest.raises(LLMError, match="no response"):
+        list(client.stream("q"))
+    assert client.calls == 3
+    assert client.cancelled == 3
+
+
+def test_timed_out_stream_that_cannot_be_cancelled_is_not_retried():
+    client = FakeClient(delay=0.2, first_chunk_timeout=0.05, max_retries=2)
+    with pytest.raises(LLMError, match="no response"):
+        list(client.stream("q"))
+    assert client.calls == 1
+
+
+def test_closing_the_stream_cancels_the_backend():
+    client = CancellableClient(chunks=("a", "b", "c"), delay=0.05, first_chunk_timeout=1.0)
+    stream = client.stream("q")
+    assert next(stream) == "a"
+    stream.close()
+    assert client.cancelled == 1
+    assert client.closed.wait(1)
@@ -0,0 +1,29 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("chromadb")
+from utils.vector_store import maximal_marginal_relevance
+
+
+def test_first_pick_is_most_relevant():
+    query = np.array([1.0, 0.0])
+    embeddings = np.array([[0.0, 1.0], [1.0, 0.1], [0.7, 0.7]])
+    assert maximal_marginal_relevance(query, embeddings, k=1, lambda_mult=0.5) == [1]
+
+
+def test_near_duplicates_are_passed_over():
+    query = np.array([1.0, 0.0, 0.0])
+    embeddings = np.array([
+        [1.0, 0.0, 0.0],
+        [0.99, 0.01, 0.0],  # near-duplicate of the best match
+        [0.7, 0.0, 0.7],
+    ])
+    assert maximal_marginal_relevance(query, embeddings, k=2, lambda_mult=0.3) == [0, 2]
+    # With lambda 1 it is plain relevance ranking
+    assert maximal_marginal_relevance(query, embeddings, k=2, lambda_mult=1.0) == [0, 1]
+
+
+def test_k_larger_than_candidates_and_empty_input():
+    embeddings = np.eye(3)
+    assert sorted(maximal_marginal_relevance(np.ones(3), embeddings, k=10, lambda_mult=0.5)) == [0, 1, 2]
+    assert maximal_marginal_relevance(np.ones(3), np.empty((0, 3)), k=3, lambda_mult=0.5) == []
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("PyPDF2")
+from config import Config
+from utils.pdf_processor import PDFProcessor
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setattr(Config, "CHUNK_SIZE", 10)
+    monkeypatch.setattr(Config, "CHUNK_OVERLAP", 0)
+    return PDFProcessor("unused")
+
+
+def test_chunks_are_tagged_with_the_page_they_start_on(processor):
+    # Page one starts with whitespace that is stripped before chunking
+    pages = ["  aaaaaaaaa", "bbbbbbbbbb", "cccc"]
+    chunks = processor.chunk_pages(pages, "guide.pdf")
+
+    assert [(chunk['content'], chunk['page']) for chunk in chunks] == [
+        ("aaaaaaaaa", 1),
+        ("bbbbbbbbbb", 2),
+        ("cccc", 3)  # the window starts on the space between pages
+    ]
+    assert [chunk['chunk_id'] for chunk in chunks] == ["guide.pdf_chunk_0", "guide.pdf_chunk_1", "guide.pdf_chunk_2"]
+    assert chunks[0]['title'] == "guide"
+
+
+def test_newlines_inside_a_page_do_not_shift_later_pages(processor):
+    chunks = processor.chunk_pages(["aaaa\naaaa\n", "bbbbbbbbb"], "guide.pdf", title="Guide")
+    assert [(chunk['content'], chunk['page']) for chunk in chunks] == [("aaaa aaaa", 1), ("bbbbbbbbb", 2)]
+    assert chunks[0]['title'] == "Guide"
+
+
+@pytest.mark.parametrize("filename, doc_type", [
+    ("NVDA Shortcuts Checklist.pdf", "screen reader shortcuts"),  # earlier keywords win
+    ("Forms checklist - cheat sheet.pdf", "checklist"),
+    ("ARIA_QuickRef.pdf", "quick reference"),
+    ("Contrast checker tools.pdf", "tool"),
+    ("Mobile eval guide.pdf", "evaluation guide"),
+    ("Intro to accessibility.pdf", "article")
+])
+def test_document_type_comes_from_the_first_matching_keyword(processor, filename, doc_type):
+    assert processor.get_document_type(filename) == doc_type
@@ -0,0 +1,151 @@
+import os
+import time
+from config import Config
+from utils.pdf_watcher import PDFWatcher
+
+
+class FakeProcessor:
+    def __init__(self, pdf_directory):
+        self.pdf_directory = pdf_directory
+
+    def list_pdfs(self):
+        return sorted(name for name in os.listdir(self.pdf_directory) if name.endswith(".pdf"))
+
+    def process_pdf(self, filename):
+        return [{"content": filename, "source": filename}]
+
+
+class FakeVectorStore:
+    collection_name = "test_kb"
+
+    def __init__(self):
+        self.sources = set()
+        self.version = 0
+        self.fail = False
+        self.dead_fraction = 0.0
+
+    def get_version(self):
+        return self.version
+
+    def get_filter_options(self):
+        return {"sources": sorted(self.sources), "doc_types": []}
+
+    def get_dead_chunk_fraction(self):
+        return self.dead_fraction
+
+    def delete_source(self, source):
+        self.sources.discard(source)
+        self.version += 1
+
+    def replace_source(self, source, chunks):
+        if self.fail:
+            raise ConnectionError("embedding service unavailable")
+        self.sources.update(chunk["source"] for chunk in chunks)
+        self.version += 1
+
+
+class FakeQAChain:
+    def __init__(self, pdf_directory, vector_store):
+        self.pdf_directory = pdf_directory
+        self.vector_store = vector_store
+        self.warmups = 0
+        self.refreshes = 0
+
+    def create_pdf_processor(self):
+        return FakeProcessor(self.pdf_directory)
+
+    def get_refresh_job(self):
+        return None
+
+    def refresh_knowledge_base(self):
+        self.refreshes += 1
+
+    def _start_featured_warmup(self):
+        self.warmups += 1
+
+
+def write_pdf(path, content):
+    with open(path, 'w') as file:
+        file.write(content)
+
+
+def test_changes_made_while_stopped_are_ingested_on_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CHROMA_DB_PATH", str(tmp_path / "db"))
+    pdfs = tmp_path / "pdfs"
+    pdfs.mkdir()
+    write_pdf(pdfs / "kept.pdf", "kept")
+    write_pdf(pdfs / "edited.pdf", "v1")
+    vector_store = FakeVectorStore()
+    vector_store.sources = {"kept.pdf", "edited.pdf"}
+
+    # First run records what is indexed
+    watcher = PDFWatcher(FakeQAChain(str(pdfs), vector_store), debounce_seconds=0)
+    watcher.start()
+    watcher.stop()
+    assert watcher.metrics()["queue_depth"] == 0
+
+    # While the app is down, one PDF is replaced and another added
+    write_pdf(pdfs / "edited.pdf", "version two")
+    write_pdf(pdfs / "added.pdf", "new")
+
+    watcher = PDFWatcher(FakeQAChain(str(pdfs), vector_store), poll_seconds=60, debounce_seconds=0)
+    watcher.start()
+    watcher.stop()
+    watcher.process_ready()
+    assert watcher.files_ingested == 2
+    assert vector_store.sources == {"kept.pdf", "edited.pdf", "added.pdf"}
+
+    # Nothing changed since, so the next start has nothing to do
+    watcher = PDFWatcher(FakeQAChain(str(pdfs), vector_store), debounce_seconds=0)
+    watcher.start()
+    watcher.stop()
+    assert watcher.metrics()["queue_depth"] == 0
+
+
+def test_failed_ingest_keeps_the_old_version_and_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CHROMA_DB_PATH", str(tmp_path / "db"))
+    pdfs = tmp_path / "pdfs"
+    pdfs.mkdir()
+    write_pdf(pdfs / "guide.pdf", "v1")
+    vector_store = FakeVectorStore()
+    vector_store.sources = {"guide.pdf"}
+    qa_chain = FakeQAChain(str(pdfs), vector_store)
+    watcher = PDFWatcher(qa_chain, poll_seconds=0.01, debounce_seconds=0)
+    watcher.poll()
+
+    write_pdf(pdfs / "guide.pdf", "version two")
+    watcher.poll()
+    vector_store.fail = True
+    watcher.process_ready()
+
+    assert vector_store.sources == {"guide.pdf"}
+    assert watcher.metrics()["queue_depth"] == 1
+    assert "unavailable" in watcher.metrics()["last_error"]
+    assert qa_chain.warmups == 0  # nothing changed, so no re-warm
+
+    vector_store.fail = False
+    time.sleep(0.03)  # past the first retry backoff
+    watcher.process_ready()
+    assert watcher.metrics()["queue_depth"] == 0
+    assert watcher.files_ingested == 1
+    assert qa_chain.warmups == 1
+
+
+def test_mostly_dead_chunk_store_triggers_a_rebuild(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CHROMA_DB_PATH", str(tmp_path / "db"))
+    pdfs = tmp_path / "pdfs"
+    pdfs.mkdir()
+    write_pdf(pdfs / "guide.pdf", "v1")
+    vector_store = FakeVectorStore()
+    qa_chain = FakeQAChain(str(pdfs), vector_store)
+    watcher = PDFWatcher(qa_chain, debounce_seconds=0)
+
+    watcher.poll()
+    watcher.process_ready()
+    assert (qa_chain.refreshes, qa_chain.warmups) == (0, 1)
+
+    write_pdf(pdfs / "guide.pdf", "version two")
+    vector_store.dead_fraction = 0.6
+    watcher.poll()
+    watcher.process_ready()
+    assert (qa_chain.refreshes, qa_chain.warmups) == (1, 1)  # the rebuild warms up on its own
@@ -0,0 +1,86 @@
+import threading
+import pytest
+from utils.request_coalescer import Flight, SingleFlight, normalize_question
+
+
+def test_normalize_question_ignores_case_spacing_and_punctuation():
+    assert normalize_question("  What is  WCAG? ") == normalize_question("what is wcag")
+
+
+def test_joiners_share_a_single_result():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute(flight):
+        calls.append(1)
+        release.wait(5)
+        return {"answer": "42"}
+
+    joined = [flights.submit("key", compute) for _ in range(5)]
+    release.set()
+
+    assert all(flight is joined[0] for flight in joined)
+    assert [flight.wait(5) for flight in joined] == [{"answer": "42"}] * 5
+    assert len(calls) == 1
+
+
+def test_finished_flight_is_forgotten():
+    flights = SingleFlight()
+    first = flights.submit("key", lambda flight: 1)
+    first.wait(5)
+    second = flights.submit("key", lambda flight: 2)
+    assert second is not first
+    assert second.wait(5) == 2
+
+
+def test_late_joiner_replays_chunks_from_the_start():
+    flights = SingleFlight()
+    halfway = threading.Event()
+    release = threading.Event()
+
+    def compute(flight):
+        flight.publish("Hello")
+        flight.publish(", ")
+        halfway.set()
+        release.wait(5)
+        flight.publish("world")
+        return "Hello, world"
+
+    flights.submit("key", compute)
+    assert halfway.wait(5)
+    late = flights.submit("key", compute)
+    release.set()
+
+    assert list(late.iter_chunks()) == ["Hello", ", ", "world"]
+    assert late.wait(5) == "Hello, world"
+
+
+def test_errors_reach_every_waiter():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def compute(flight):
+        flight.publish("partial")
+        release.wait(5)
+        raise RuntimeError("backend down")
+
+    joined = [flights.submit("key", compute) for _ in range(3)]
+    release.set()
+
+    for flight in joined:
+        with pytest.raises(RuntimeError, match="backend down"):
+            flight.wait(5)
+        # Streaming waiters see what was published, then stop
+        assert list(flight.iter_chunks()) == ["partial"]
+
+
+def test_wait_times_out():
+    with pytest.raises(TimeoutError):
+        Flight().wait(timeout=0.01)
+
+
+def test_resolved_flight_has_no_chunks():
+    flight = Flight.resolved("done")
+    assert list(flight.iter_chunks()) == []
+    assert flight.wait() == "done"
@@ -0,0 +1,78 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("chromadb")
+import utils.retrieval_sweep as retrieval_sweep
+from utils.retrieval_sweep import EmbeddingCache, normalize, pick_fastest, rank_sources, score
+
+
+class CountingModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=None):
+        self.encoded.extend(texts)
+        return np.array([[len(text), text.count("a"), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_embedding_cache_only_encodes_new_text(tmp_path, monkeypatch):
+    model = CountingModel()
+    monkeypatch.setattr(retrieval_sweep, "get_embedding_model", lambda name=None: model)
+
+    cache = EmbeddingCache(str(tmp_path), "org/model")
+    vectors, new = cache.encode(["aa", "bbb", "aa"])
+    assert new == 2
+    assert vectors.shape == (3, 3)
+    assert np.array_equal(vectors[0], vectors[2])
+    cache.save()
+
+    reloaded = EmbeddingCache(str(tmp_path), "org/model")
+    vectors, new = reloaded.encode(["bbb", "cccc"])
+    assert new == 1
+    assert sorted(model.encoded) == ["aa", "bbb", "cccc"]
+
+
+EMBEDDINGS = normalize(np.array([
+    [1.0, 0.0, 0.0],   # a.pdf
+    [0.98, 0.2, 0.0],  # a.pdf, near-duplicate
+    [0.6, 0.0, 0.8],   # b.pdf
+    [0.0, 1.0, 0.0],   # c.pdf
+]))
+SOURCES = ["a.pdf", "a.pdf", "b.pdf", "c.pdf"]
+
+
+def test_rank_sources_orders_by_similarity_and_mmr_diversifies(monkeypatch):
+    query = normalize(np.array([1.0, 0.0, 0.1]))
+    assert rank_sources(query, EMBEDDINGS, SOURCES, 2, "similarity") == ["a.pdf", "a.pdf"]
+    monkeypatch.setattr(retrieval_sweep.Config, "MMR_LAMBDA", 0.5)
+    assert rank_sources(query, EMBEDDINGS, SOURCES, 2, "mmr") == ["a.pdf", "b.pdf"]
+
+
+def test_score_hit_rate_and_mrr():
+    questions = [{"question": "q1", "sources": ["a.pdf"]},
+                 {"question": "q2", "sources": ["c.pdf"]},
+                 {"question": "q3", "sources": ["missing.pdf"]}]
+    query_vectors = normalize(np.array([[1.0, 0.0, 0.0], [0.5, 0.6, 0.0], [1.0, 0.0, 0.0]]))
+    result = score(questions, query_vectors, EMBEDDINGS, SOURCES, 2, "similarity")
+    # q1 hits at rank 1, q2 at rank 2 (behind a.pdf), q3 misses
+    assert result["hit_rate"] == pytest.approx(2 / 3)
+    assert result["mrr"] == pytest.approx((1 + 0.5) / 3)
+
+
+def row(**values):
+    base = {"hit_rate": 0.9, "mrr": 0.8, "index_mb": 1.0, "chunks": 100, "top_k": 5,
+            "retrieval_mode": "mmr", "search_ms": 0.05}
+    base.update(values)
+    return base
+
+
+def test_pick_fastest_uses_cost_proxies_not_search_timing():
+    results = [
+        row(top_k=5, search_ms=0.01),
+        row(top_k=3, search_ms=0.09),
+        row(top_k=3, retrieval_mode="similarity", search_ms=0.07),
+        row(index_mb=0.5, chunks=50, hit_rate=0.5),  # cheapest but below the bar
+    ]
+    best = pick_fastest(results, min_hit_rate=0.8)
+    assert (best["top_k"], best["retrieval_mode"]) == (3, "similarity")
+    assert pick_fastest(results, min_hit_rate=0.95) is None
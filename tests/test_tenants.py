@@ -0,0 +1,133 @@
+import threading
+import time
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("chromadb")
+from config import Config
+from utils.llm_client import LLMClient
+from utils.tenants import RateLimiter, TenantLimitError, TenantLLMClient, TenantRegistry, TenantStats
+
+
+class FakeLLM(LLMClient):
+    name = "fake"
+
+    def __init__(self, error=None):
+        self.error = error
+
+    def generate(self, prompt):
+        if self.error:
+            raise self.error
+        return "answer"
+
+    def stream(self, prompt):
+        yield "an"
+        if self.error:
+            raise self.error
+        yield "swer"
+
+
+def tenant_client(inner, concurrency=1, per_minute=60):
+    return TenantLLMClient("team", inner, TenantStats(), threading.BoundedSemaphore(concurrency),
+                           RateLimiter(per_minute))
+
+
+def test_rate_limiter_allows_a_burst_then_refills():
+    limiter = RateLimiter(per_minute=120)
+    assert all(limiter.try_acquire() for _ in range(120))
+    assert not limiter.try_acquire()
+    time.sleep(0.6)  # two calls per second
+    assert limiter.try_acquire()
+
+
+def test_slot_is_released_after_an_error():
+    client = tenant_client(FakeLLM(error=RuntimeError("down")))
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            client.generate("q")
+    assert client.concurrency.acquire(blocking=False)
+    assert client.stats.snapshot()["failures"] == 3
+
+
+def test_slot_is_released_when_a_stream_is_closed_early():
+    client = tenant_client(FakeLLM())
+    stream = client.stream("q")
+    assert next(stream) == "an"
+    stream.close()
+    assert client.concurrency.acquire(blocking=False)
+    assert client.stats.snapshot()["calls"] == 1
+
+
+def test_busy_and_rate_limited_calls_are_rejected_and_counted(monkeypatch):
+    monkeypatch.setattr(Config, "TENANT_QUEUE_TIMEOUT", 0.01)
+    client = tenant_client(FakeLLM(), per_minute=2)
+    stream = client.stream("q")
+    next(stream)  # holds the only slot
+    with pytest.raises(TenantLimitError, match="too many"):
+        client.generate("q")
+    stream.close()
+    with pytest.raises(TenantLimitError, match="rate limit"):
+        client.generate("q")
+    assert client.stats.snapshot()["rejected"] == 2
+
+
+class FakeVectorStore:
+    def __init__(self, collection_name):
+        self.collection_name = collection_name
+
+
+class FakeChain:
+    built = []
+
+    def __init__(self, collection_name, pdf_directory, featured_answers_path, featured_questions, delay=0.0):
+        time.sleep(delay)
+        FakeChain.built.append(collection_name)
+        self.featured_questions = featured_questions
+        self.llm = FakeLLM()
+        self.vector_store = FakeVectorStore(collection_name)
+
+
+def test_least_recently_used_team_is_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "TENANTS_DIRECTORY", str(tmp_path))
+    registry = TenantRegistry(max_loaded=2, chain_factory=FakeChain)
+    first = registry.get("alpha")
+    registry.get("beta")
+    assert registry.get("alpha") is first  # alpha is now most recently used
+    registry.get("gamma")                  # evicts beta
+
+    assert registry.get("alpha") is first
+    beta = registry.get("beta")
+    assert isinstance(beta.llm, TenantLLMClient)
+    # Limits and counters outlive eviction
+    assert beta.llm.concurrency is registry._concurrency["beta"]
+
+
+def test_loading_one_team_does_not_block_loaded_teams(monkeypatch):
+    FakeChain.built = []
+    slow = lambda **options: FakeChain(delay=0.5, **options) if options["collection_name"].endswith("_slow") \
+        else FakeChain(**options)
+    registry = TenantRegistry(max_loaded=4, chain_factory=slow)
+    registry.get("fast")
+
+    loaders = [threading.Thread(target=registry.get, args=("slow",)) for _ in range(3)]
+    for loader in loaders:
+        loader.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    registry.get("fast")
+    assert time.monotonic() - started < 0.1
+    for loader in loaders:
+        loader.join()
+    assert FakeChain.built.count(f"{Config.COLLECTION_NAME}_slow") == 1
+
+
+def test_teams_only_feature_their_own_questions(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "TENANTS_DIRECTORY", str(tmp_path))
+    (tmp_path / "alpha").mkdir()
+    (tmp_path / "alpha" / Config.FEATURED_QUESTIONS_FILENAME).write_text('["How do I caption videos?"]')
+    (tmp_path / "beta").mkdir()
+    registry = TenantRegistry(max_loaded=4, chain_factory=FakeChain)
+
+    assert registry.get(Config.DEFAULT_TENANT).featured_questions == Config.FEATURED_QUESTIONS
+    assert registry.get("alpha").featured_questions == ["How do I caption videos?"]
+    assert registry.get("beta").featured_questions == []
@@ -0,0 +1,159 @@
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("chromadb")
+from config import Config
+from utils import vector_store as vector_store_module
+from utils.chunk_store import ChunkStore
+from utils.vector_store import VectorStore
+
+
+class FakeEmbeddings:
+    def encode(self, texts):
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+        self.metadata = None
+        self.rows = {}
+
+    def modify(self, metadata):
+        self.metadata = metadata
+
+    def upsert(self, embeddings, metadatas, ids):
+        for chunk_id, embedding, metadata in zip(ids, embeddings, metadatas):
+            self.rows[chunk_id] = (embedding, metadata)
+
+    def get(self, ids=None, where=None, include=()):
+        chunk_ids = [
+            chunk_id for chunk_id, (_, metadata) in self.rows.items()
+            if (ids is None or chunk_id in ids)
+            and (where is None or metadata.get('source') == where['source'])
+        ]
+        return {'ids': chunk_ids, 'metadatas': [self.rows[chunk_id][1] for chunk_id in chunk_ids]}
+
+    def delete(self, ids=None, where=None):
+        for chunk_id in self.get(ids=ids, where=where)['ids']:
+            del self.rows[chunk_id]
+
+    def count(self):
+        return len(self.rows)
+
+    def query(self, query_embeddings, n_results, where=None, include=()):
+        chunk_ids = list(self.rows)[:n_results]
+        return {
+            'ids': [chunk_ids],
+            'metadatas': [[self.rows[chunk_id][1] for chunk_id in chunk_ids]],
+            'distances': [[0.0] * len(chunk_ids)],
+            'embeddings': [[self.rows[chunk_id][0] for chunk_id in chunk_ids]]
+        }
+
+
+class FakeClient:
+    def __init__(self):
+        self.collections = {}
+
+    def get_collection(self, name):
+        return self.collections[name]
+
+    def create_collection(self, name):
+        self.collections[name] = FakeCollection(name)
+        return self.collections[name]
+
+    def list_collections(self):
+        return list(self.collections)
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(Config, "CHROMA_DB_PATH", str(tmp_path))
+    monkeypatch.setattr(Config, "RETRIEVAL_MODE", "similarity")
+    monkeypatch.setattr(vector_store_module, "SENTENCE_TRANSFORMERS_AVAILABLE", True)
+    monkeypatch.setattr(vector_store_module, "Settings", dict)
+    monkeypatch.setattr(vector_store_module.chromadb, "PersistentClient",
+                        lambda path, settings: client, raising=False)
+    monkeypatch.setattr(vector_store_module, "get_embedding_model", FakeEmbeddings)
+    return client
+
+
+def make_chunks(text, count=2):
+    return [{'content': f"{text} {i}", 'source': f"{text}.pdf", 'chunk_id': f"{text}_{i}"} for i in range(count)]
+
+
+def searched_sources(store):
+    return {record.source for record in store.search("contrast")}
+
+
+def test_queries_during_a_rebuild_are_served_from_the_old_index(client):
+    store = VectorStore("kb")
+    store.add_documents(make_chunks("old"))
+    old_version = store.get_version()
+    seen = []
+
+    def progress(completed, total):
+        # The new collection is being filled; readers must not see it yet
+        seen.append((searched_sources(store), store.get_version()))
+
+    store.rebuild(make_chunks("new"), progress=progress)
+
+    assert seen and all(entry == ({"old.pdf"}, old_version) for entry in seen)
+    assert searched_sources(store) == {"new.pdf"}
+    assert store.get_version() != old_version
+
+
+def test_other_stores_follow_the_active_pointer(client):
+    store = VectorStore("kb")
+    store.add_documents(make_chunks("old"))
+    other = VectorStore("kb")
+    assert searched_sources(other) == {"old.pdf"}
+
+    name = store.rebuild(make_chunks("new"))
+
+    assert searched_sources(other) == {"new.pdf"}
+    assert other.index.name == name
+    # A store opened later starts on the swapped-in collection too
+    assert VectorStore("kb").index.name == name
+
+
+def test_stale_collections_are_dropped_and_the_previous_one_kept(client):
+    store = VectorStore("kb")
+    store.add_documents(make_chunks("first"))
+    first = store.rebuild(make_chunks("second"))
+    second = store.rebuild(make_chunks("third"))
+
+    assert set(client.list_collections()) == {first, second}
+    original = ChunkStore("kb")
+    assert len(original) == 0 and not os.path.exists(original.blob_path)
+    assert len(ChunkStore(first)) == 2
+    assert searched_sources(store) == {"third.pdf"}
+
+
+def test_replaced_and_deleted_sources_count_as_dead_chunks(client):
+    store = VectorStore("kb")
+    store.add_documents(make_chunks("guide") + make_chunks("faq"))
+    assert store.get_dead_chunk_fraction() == 0.0
+
+    store.replace_source("guide.pdf", make_chunks("guide"))
+    assert store.get_dead_chunk_fraction() == pytest.approx(2 / 6)
+    store.delete_source("faq.pdf")
+    assert store.get_dead_chunk_fraction() == pytest.approx(4 / 6)
+
+    store.rebuild(make_chunks("guide"))
+    assert store.get_dead_chunk_fraction() == 0.0
+
+
+def test_filter_combines_sources_and_document_types():
+    assert VectorStore.build_filter() is None
+    assert VectorStore.build_filter(sources=["a.pdf"]) == {'source': {'$in': ["a.pdf"]}}
+    assert VectorStore.build_filter(doc_types=("checklist",)) == {'doc_type': {'$in': ["checklist"]}}
+    assert VectorStore.build_filter(["a.pdf", "b.pdf"], ["tool"]) == {'$and': [
+        {'source': {'$in': ["a.pdf", "b.pdf"]}},
+        {'doc_type': {'$in': ["tool"]}}
+    ]}
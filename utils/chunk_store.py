@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import mmap
+import threading
+from array import array
+from typing import Dict, List
+from config import Config
+
+
+class ChunkRecord:
+    """A retrieved chunk. Slots keep per-result overhead to a few pointers."""
+
+    __slots__ = ('row', 'content', 'source', 'metadata', 'distance')
+
+    def __init__(self, row: int, content: str, source: str, metadata: Dict, distance: float):
+        self.row = row
+        self.content = content
+        self.source = source
+        self.metadata = metadata
+        self.distance = distance
+
+    def __repr__(self):
+        return f"ChunkRecord(row={self.row}, source={self.source!r}, distance={self.distance:.4f})"
+
+
+class ChunkStore:
+    """Compact, append-only storage for chunk text, kept apart from the vector index.
+
+    Text lives in one UTF-8 blob that is memory-mapped for reads, so only the
+    pages backing the final top-k results are ever touched. An in-memory
+    array holds (offset, length, source id) per row and source names are
+    interned, so the resident cost per chunk is 24 bytes however long the
+    corpus grows.
+    """
+
+    FIELDS = 3  # offset, length, source id
+
+    def __init__(self, name: str, directory: str = None):
+        base = os.path.join(directory or Config.CHROMA_DB_PATH, name)
+        self.blob_path = f"{base}.chunks"
+        self.index_path = f"{base}.chunks.idx"
+        self.sources_path = f"{base}.chunks.sources.json"
+        self._lock = threading.RLock()
+        self._index = array('Q')
+        self._sources: List[str] = []
+        self._source_ids: Dict[str, int] = {}
+        self._blob = None
+        self._mmap = None
+        self._load()
+
+    def _load(self):
+        os.makedirs(os.path.dirname(self.blob_path) or ".", exist_ok=True)
+        if os.path.exists(self.sources_path):
+            with open(self.sources_path, 'r', encoding='utf-8') as file:
+                self._sources = [sys.intern(source) for source in json.load(file)]
+            self._source_ids = {source: i for i, source in enumerate(self._sources)}
+        index_size = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as file:
+                data = file.read()
+            index_size = len(data)
+            usable = len(data) - len(data) % (self._index.itemsize * self.FIELDS)
+            self._index.frombytes(data[:usable])
+        # Drop index entries for text that never made it to disk (interrupted append)
+        blob_size = os.path.getsize(self.blob_path) if os.path.exists(self.blob_path) else 0
+        while len(self._index) and self._index[-3] + self._index[-2] > blob_size:
+            del self._index[-3:]
+        # ...and cut them, with any partial entry, from the file too
+        if index_size > self._index_bytes(len(self)):
+            with open(self.index_path, 'r+b') as file:
+                file.truncate(self._index_bytes(len(self)))
+        self._remap()
+
+    def _index_bytes(self, rows: int) -> int:
+        return rows * self.FIELDS * self._index.itemsize
+
+    def _remap(self):
+        self.close()
+        if os.path.exists(self.blob_path) and os.path.getsize(self.blob_path) > 0:
+            self._blob = open(self.blob_path, 'rb')
+            self._mmap = mmap.mmap(self._blob.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _intern_source(self, source: str) -> int:
+        source_id = self._source_ids.get(source)
+        if source_id is None:
+            source_id = len(self._sources)
+            self._sources.append(sys.intern(source))
+            self._source_ids[source] = source_id
+        return source_id
+
+    def __len__(self) -> int:
+        return len(self._index) // self.FIELDS
+
+    def append(self, texts: List[str], sources: List[str]) -> List[int]:
+        """Store chunk texts and return their row ids."""
+        with self._lock:
+            first_row = len(self)
+            source_count = len(self._sources)
+            offset = os.path.getsize(self.blob_path) if os.path.exists(self.blob_path) else 0
+            entries = array('Q')
+            encoded = []
+            for text, source in zip(texts, sources):
+                data = text.encode('utf-8')
+                entries.extend((offset, len(data), self._intern_source(source)))
+                encoded.append(data)
+                offset += len(data)
+
+            # Text first, then the index, so a crash never leaves rows pointing past the blob
+            with open(self.blob_path, 'ab') as file:
+                file.write(b"".join(encoded))
+            if len(self._sources) != source_count:
+                with open(self.sources_path, 'w', encoding='utf-8') as file:
+                    json.dump(self._sources, file, ensure_ascii=False)
+            # Write at the row's own position rather than appending, so the file can't drift from the rows
+            with open(self.index_path, 'r+b' if os.path.exists(self.index_path) else 'wb') as file:
+                file.seek(self._index_bytes(first_row))
+                entries.tofile(file)
+                file.truncate()
+
+            self._index.extend(entries)
+            self._remap()
+            return list(range(first_row, len(self)))
+
+    def get_text(self, row: int) -> str:
+        with self._lock:
+            start = row * self.FIELDS
+            offset, length = self._index[start], self._index[start + 1]
+            return self._mmap[offset:offset + length].decode('utf-8')
+
+    def get_source(self, row: int) -> str:
+        with self._lock:
+            return self._sources[self._index[row * self.FIELDS + 2]]
+
+    def reset(self):
+        """Delete all stored chunks."""
+        with self._lock:
+            self.close()
+            for path in (self.blob_path, self.index_path, self.sources_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._index = array('Q')
+            self._sources = []
+            self._source_ids = {}
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._blob.close()
+                self._mmap = self._blob = None
+
@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+from config import Config
+from .request_coalescer import normalize_question
+
+
+def load_featured_questions(path: str) -> List[str]:
+    """Read a team's featured questions (a JSON list of strings); missing or invalid files give none."""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            questions = json.load(file)
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not read featured questions from {path}: {str(e)}")
+        return []
+    if not isinstance(questions, list):
+        print(f"Warning: featured questions in {path} must be a list")
+        return []
+    return [question.strip() for question in questions if isinstance(question, str) and question.strip()]
+
+
+class FeaturedAnswerStore:
+    """Precomputed answers for the featured questions, persisted next to the index.
+
+    Answers are stored together with the knowledge-base version they were
+    generated against and are ignored once the index changes.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.FEATURED_ANSWERS_PATH
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._data = {"kb_version": None, "answers": {}}
+
+    def _refresh(self):
+        """Reload the file if another session has rewritten it since we last read it."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self._data = json.load(file)
+            self._mtime = mtime
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not read featured answers from {self.path}: {str(e)}")
+
+    def get(self, question: str, kb_version: str) -> Optional[Dict]:
+        """Return the stored answer for a question if it matches the current index version."""
+        with self._lock:
+            self._refresh()
+            if self._data.get("kb_version") != kb_version:
+                return None
+            answer = self._data["answers"].get(normalize_question(question))
+            return dict(answer) if answer else None
+
+    def has_all(self, questions, kb_version: str) -> bool:
+        return all(self.get(question, kb_version) for question in questions)
+
+    def save(self, kb_version: str, answers: Dict[str, Dict]):
+        """Persist answers (keyed by question) for the given index version."""
+        data = {
+            "kb_version": kb_version,
+            "answers": {normalize_question(question): answer for question, answer in answers.items()}
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self._data = data
+            self._mtime = os.path.getmtime(self.path)
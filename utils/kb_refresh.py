@@ -0,0 +1,109 @@
+import threading
+import time
+from typing import Dict, Optional
+
+
+class RefreshJob:
+    """A knowledge-base rebuild running on a background thread.
+
+    The new index is built into a shadow collection and swapped in only when
+    it is complete, so questions keep being answered from the old one.
+    """
+
+    def __init__(self, qa_chain):
+        self.qa_chain = qa_chain
+        self.state = "pending"  # pending, running, done, failed
+        self.stage = "Queued"
+        self.completed = 0
+        self.total = 0
+        self.chunk_count = 0
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def is_running(self) -> bool:
+        return self.state in ("pending", "running")
+
+    @property
+    def fraction(self) -> float:
+        return self.completed / self.total if self.total else 0.0
+
+    def describe(self) -> str:
+        """Human-readable progress for the UI."""
+        if self.state == "done":
+            elapsed = self.finished_at - self.started_at
+            return f"✅ Knowledge base refreshed with {self.chunk_count} chunks in {elapsed:.0f}s"
+        if self.state == "failed":
+            return f"❌ Failed to refresh knowledge base: {self.error}"
+        if self.total:
+            return f"🔄 {self.stage}: {self.completed}/{self.total} ({self.fraction:.0%})"
+        return f"🔄 {self.stage}..."
+
+    def start(self):
+        self._thread.start()
+
+    def wait(self, timeout: float = None) -> bool:
+        self._thread.join(timeout)
+        return not self.is_running
+
+    def _progress(self, completed: int, total: int):
+        self.completed = completed
+        self.total = total
+
+    def _run(self):
+        self.state = "running"
+        self.started_at = time.time()
+        try:
+            processor = self.qa_chain.create_pdf_processor()
+            pdf_files = processor.list_pdfs()
+
+            self.stage = "Extracting PDFs"
+            chunks = []
+            for i, filename in enumerate(pdf_files):
+                chunks.extend(processor.process_pdf(filename))
+                self._progress(i + 1, len(pdf_files))
+            if not chunks:
+                raise ValueError("no chunks created from PDFs")
+
+            self.stage = "Embedding chunks"
+            self._progress(0, len(chunks))
+            self.qa_chain.vector_store.rebuild(chunks, progress=self._progress)
+
+            self.chunk_count = len(chunks)
+            self.finished_at = time.time()
+            self.state = "done"
+            self.qa_chain._start_featured_warmup()
+        except Exception as e:
+            print(f"Error refreshing knowledge base: {str(e)}")
+            self.error = str(e)
+            self.finished_at = time.time()
+            self.state = "failed"
+        finally:
+            # Finished jobs stay in the registry for status; don't keep the knowledge base alive
+            self.qa_chain = None
+
+
+# One refresh per knowledge base at a time, shared by every session in the process
+_jobs: Dict[str, RefreshJob] = {}
+_jobs_lock = threading.Lock()
+
+
+def start_refresh(qa_chain) -> RefreshJob:
+    """Start a background rebuild, or return the one already running for this knowledge base."""
+    key = qa_chain.vector_store.collection_name
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None and job.is_running:
+            return job
+        job = RefreshJob(qa_chain)
+        _jobs[key] = job
+    job.start()
+    return job
+
+
+def get_refresh_job(collection_name: str) -> Optional[RefreshJob]:
+    """Get the most recent refresh job for a knowledge base."""
+    with _jobs_lock:
+        return _jobs.get(collection_name)
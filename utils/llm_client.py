@@ -0,0 +1,444 @@
+import json
+import queue
+import random
+import threading
+import time
+from typing import Callable, Iterator, Optional
+from config import Config
+
+# Try to import the backend libraries, but don't fail if they're not available
+try:
+    import replicate
+    from replicate.exceptions import ModelError
+    REPLICATE_AVAILABLE = True
+except ImportError:
+    REPLICATE_AVAILABLE = False
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+
+class LLMError(Exception):
+    """Raised when an LLM backend fails to produce a completion."""
+
+
+class CircuitOpenError(LLMError):
+    """Raised when a backend is skipped because its circuit breaker is open."""
+
+
+class LLMTimeoutError(LLMError):
+    """Raised when a backend doesn't start streaming within LLM_FIRST_CHUNK_TIMEOUT.
+
+    `cancelled` says whether the backend request was actually stopped; if it
+    wasn't, it may still be generating (and billing) in the background.
+    """
+
+    def __init__(self, message: str, cancelled: bool = False):
+        super().__init__(message)
+        self.cancelled = cancelled
+
+
+class StreamCancel:
+    """Lets another thread stop a backend stream that is blocked waiting for output."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._result = None
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._result is not None
+
+    def add(self, callback: Callable[[], None]):
+        """Register how to cancel the request; runs at once if cancel() was already called."""
+        with self._lock:
+            if self._result is None:
+                self._callbacks.append(callback)
+                return
+        self._call(callback)
+
+    def cancel(self) -> bool:
+        """Cancel the request, returning True if the backend was told to stop."""
+        with self._lock:
+            if self._result is not None:
+                return self._result
+            callbacks, self._callbacks = self._callbacks, []
+            self._result = False
+        cancelled = any([self._call(callback) for callback in callbacks])
+        with self._lock:
+            self._result = cancelled
+        return cancelled
+
+    @staticmethod
+    def _call(callback: Callable[[], None]) -> bool:
+        try:
+            callback()
+            return True
+        except Exception as e:
+            print(f"Warning: could not cancel LLM request: {str(e)}")
+            return False
+
+
+class CircuitBreaker:
+    """Stop calling a backend after repeated failures, then probe it again after a cool-down."""
+
+    def __init__(self, failure_threshold: int = None, reset_seconds: float = None):
+        self.failure_threshold = failure_threshold or Config.LLM_CIRCUIT_FAILURE_THRESHOLD
+        self.reset_seconds = reset_seconds or Config.LLM_CIRCUIT_RESET_SECONDS
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """Return True if a call may go through (closed, or a single half-open probe)."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """End a half-open probe that neither succeeded nor failed, so another can run."""
+        with self._lock:
+            self._probing = False
+
+
+class LLMClient:
+    """Base class for chat-completion backends used by QAChain.
+
+    Subclasses implement `_complete` (and optionally `_stream`); the public
+    `generate` and `stream` methods add retries with jittered backoff and a
+    circuit breaker around them.
+    """
+
+    name = "llm"
+
+    def __init__(self, temperature: float = None, max_tokens: int = None, max_retries: int = None,
+                 first_chunk_timeout: float = None):
+        self.temperature = Config.LLM_TEMPERATURE if temperature is None else temperature
+        self.max_tokens = max_tokens or Config.LLM_MAX_TOKENS
+        self.max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.first_chunk_timeout = Config.LLM_FIRST_CHUNK_TIMEOUT if first_chunk_timeout is None else first_chunk_timeout
+        # Cleared by FailoverLLMClient: a slow backend is better skipped than waited on again
+        self.retry_timeouts = True
+        self.breaker = CircuitBreaker()
+
+    def _complete(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def _stream(self, prompt: str, cancel: StreamCancel) -> Iterator[str]:
+        # Backends that can stop a request register it with cancel.add()
+        yield self._complete(prompt)
+
+    def _is_retryable(self, error: Exception) -> bool:
+        return True
+
+    @staticmethod
+    def _is_timeout(error: Exception) -> bool:
+        if isinstance(error, (TimeoutError, LLMTimeoutError)):
+            return True
+        return HTTPX_AVAILABLE and isinstance(error, httpx.TimeoutException)
+
+    def _backoff(self, attempt: int):
+        """Sleep with full jitter so concurrent retries don't hit the backend in lockstep."""
+        ceiling = min(Config.LLM_RETRY_MAX_DELAY, Config.LLM_RETRY_BASE_DELAY * (2 ** attempt))
+        time.sleep(random.uniform(0, ceiling))
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} backend is temporarily disabled after repeated failures")
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        print(f"Warning: {self.name} call failed (attempt {attempt + 1}): {str(error)}")
+        if not self._is_retryable(error):
+            # The backend answered; the request itself was bad, so don't hold it against the circuit
+            self.breaker.release()
+            return False
+        self.breaker.record_failure()
+        if self._is_timeout(error):
+            # A slow backend is better skipped than waited on again, and retrying while
+            # the timed-out generation still runs would pay for both
+            if not self.retry_timeouts or not getattr(error, "cancelled", True):
+                return False
+        return attempt < self.max_retries and not self.breaker.is_open
+
+    def generate(self, prompt: str) -> str:
+        """Return the full completion for a prompt."""
+        for attempt in range(self.max_retries + 1):
+            self._check_circuit()
+            try:
+                answer = self._complete(prompt)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise LLMError(f"{self.name} request failed: {str(e)}") from e
+                self._backoff(attempt)
+                continue
+            self.breaker.record_success()
+            return answer
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the completion in chunks as the backend produces them.
+
+        Failures are only retried before the first chunk; once output has been
+        handed to the caller it cannot be replayed.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._check_circuit()
+            emitted = False
+            chunks = self._cancellable_stream(prompt)
+            try:
+                for chunk in chunks:
+                    emitted = True
+                    yield chunk
+            except Exception as e:
+                if emitted or not self._should_retry(e, attempt):
+                    raise LLMError(f"{self.name} stream failed: {str(e)}") from e
+                self._backoff(attempt)
+                continue
+            finally:
+                # The caller may abandon the stream (GeneratorExit): cancel the backend
+                # request and don't leave a probe hanging
+                chunks.close()
+                self.breaker.release()
+            self.breaker.record_success()
+            return
+
+    def _cancellable_stream(self, prompt: str) -> Iterator[str]:
+        """Read the backend stream on a helper thread so the first chunk can have a deadline.
+
+        If no chunk arrives within first_chunk_timeout, or the caller stops
+        reading, the backend request is cancelled and the helper stops reading
+        it. After the first chunk, gaps are left to the HTTP read timeout.
+        """
+        cancel = StreamCancel()
+        results = queue.Queue()
+        finished = object()
+
+        def pump():
+            chunks = None
+            try:
+                chunks = self._stream(prompt, cancel)
+                for chunk in chunks:
+                    if cancel.is_cancelled:
+                        break
+                    results.put((chunk, None))
+                results.put((finished, None))
+            except Exception as e:
+                results.put((None, e))
+            finally:
+                if chunks is not None:
+                    chunks.close()
+
+        threading.Thread(target=pump, daemon=True).start()
+        timeout = self.first_chunk_timeout or None
+        done = False
+        try:
+            while True:
+                try:
+                    chunk, error = results.get(timeout=timeout)
+                except queue.Empty:
+                    cancelled = cancel.cancel()
+                    raise LLMTimeoutError(f"no response within {self.first_chunk_timeout:g}s",
+                                          cancelled=cancelled) from None
+                if error is not None:
+                    done = True
+                    raise error
+                if chunk is finished:
+                    done = True
+                    return
+                timeout = None
+                yield chunk
+        finally:
+            # Timed out, or the caller closed the stream (GeneratorExit): stop the generation
+            if not done:
+                cancel.cancel()
+
+
+class ReplicateLLMClient(LLMClient):
+    """Hosted model on Replicate, reusing one pooled HTTP client across requests."""
+
+    name = "replicate"
+
+    def __init__(self, model: str = None, api_token: str = None, **kwargs):
+        if not REPLICATE_AVAILABLE:
+            raise ImportError("replicate is required. Install with: pip install replicate")
+        super().__init__(**kwargs)
+        self.model = model or Config.CHAT_MODEL
+        timeout = httpx.Timeout(Config.LLM_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT) if HTTPX_AVAILABLE else None
+        self.client = replicate.Client(
+            api_token=api_token or Config.REPLICATE_API_TOKEN,
+            timeout=timeout
+        )
+
+    def _input(self, prompt: str) -> dict:
+        return {
+            "prompt": prompt,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+
+    def _complete(self, prompt: str) -> str:
+        response = self.client.run(self.model, input=self._input(prompt))
+
+        # Handle response - Replicate may return a list of strings or FileOutput objects
+        if isinstance(response, list):
+            return "".join([str(item) for item in response]).strip()
+        return str(response).strip()
+
+    def _create_prediction(self, prompt: str):
+        if ":" in self.model:
+            return self.client.predictions.create(
+                version=self.model.split(":", 1)[1], input=self._input(prompt), stream=True
+            )
+        return self.client.models.predictions.create(model=self.model, input=self._input(prompt), stream=True)
+
+    def _stream(self, prompt: str, cancel: StreamCancel) -> Iterator[str]:
+        # Create the prediction ourselves (rather than client.stream) so it can be cancelled
+        prediction = self._create_prediction(prompt)
+        cancel.add(prediction.cancel)
+        for event in prediction.stream():
+            text = str(event)
+            if text:
+                yield text
+
+    def _is_retryable(self, error: Exception) -> bool:
+        # The model itself failed on this input; retrying won't change that
+        return not isinstance(error, ModelError)
+
+
+class LocalLLMClient(LLMClient):
+    """Any OpenAI-compatible chat completions server (vLLM, llama.cpp, Ollama, or a mock)."""
+
+    name = "local"
+
+    def __init__(self, base_url: str = None, model: str = None, api_key: str = None, **kwargs):
+        if not HTTPX_AVAILABLE:
+            raise ImportError("httpx is required. Install with: pip install httpx")
+        super().__init__(**kwargs)
+        self.model = model or Config.LOCAL_LLM_MODEL
+        api_key = api_key or Config.LOCAL_LLM_API_KEY
+        self.client = httpx.Client(
+            base_url=base_url or Config.LOCAL_LLM_BASE_URL,
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            timeout=httpx.Timeout(Config.LLM_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_keepalive_connections=Config.LLM_MAX_CONNECTIONS,
+                                max_connections=Config.LLM_MAX_CONNECTIONS)
+        )
+
+    def _payload(self, prompt: str, stream: bool) -> dict:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": stream
+        }
+
+    def _complete(self, prompt: str) -> str:
+        response = self.client.post("/chat/completions", json=self._payload(prompt, stream=False))
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+
+    def _stream(self, prompt: str, cancel: StreamCancel) -> Iterator[str]:
+        with self.client.stream("POST", "/chat/completions", json=self._payload(prompt, stream=True)) as response:
+            # Servers such as vLLM abort the generation when the client disconnects
+            cancel.add(response.close)
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+    def _is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+            return status == 429 or status >= 500
+        return True
+
+
+class FailoverLLMClient(LLMClient):
+    """Send requests to a primary backend and fall back to a secondary one when it fails."""
+
+    def __init__(self, primary: LLMClient, fallback: LLMClient):
+        self.primary = primary
+        self.fallback = fallback
+        self.primary.retry_timeouts = False
+        self.name = f"{primary.name}->{fallback.name}"
+
+    def _failover(self, error: LLMError):
+        print(f"Warning: {str(error)}. Falling back to {self.fallback.name} backend")
+
+    def generate(self, prompt: str) -> str:
+        try:
+            return self.primary.generate(prompt)
+        except LLMError as e:
+            self._failover(e)
+            return self.fallback.generate(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        emitted = False
+        try:
+            for chunk in self.primary.stream(prompt):
+                emitted = True
+                yield chunk
+            return
+        except LLMError as e:
+            if emitted:
+                raise
+            self._failover(e)
+        yield from self.fallback.stream(prompt)
+
+
+BACKENDS = {
+    "replicate": ReplicateLLMClient,
+    "local": LocalLLMClient
+}
+
+
+def create_llm_client(backend: str = None, fallback: Optional[str] = None) -> LLMClient:
+    """Build the LLM client described by Config (or the given backend names)."""
+    backend = backend or Config.LLM_BACKEND
+    fallback = Config.LLM_FALLBACK_BACKEND if fallback is None else fallback
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+
+    client = BACKENDS[backend]()
+    if fallback and fallback != backend:
+        if fallback not in BACKENDS:
+            raise ValueError(f"Unknown LLM fallback backend '{fallback}'. Choose one of: {', '.join(BACKENDS)}")
+        try:
+            client = FailoverLLMClient(client, BACKENDS[fallback]())
+        except ImportError as e:
+            print(f"Warning: fallback backend unavailable: {str(e)}")
+    return client
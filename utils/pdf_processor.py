@@ -1,51 +1,102 @@
 import os
+import bisect
 import PyPDF2
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from config import Config
 
+# Filename keywords used to tag each PDF with a document type, checked in order
+DOCUMENT_TYPE_KEYWORDS = [
+    ("shortcuts", "screen reader shortcuts"),
+    ("checklist", "checklist"),
+    ("cheat sheet", "cheat sheet"),
+    ("quickref", "quick reference"),
+    ("checker", "tool"),
+    ("tools", "tool"),
+    ("eval", "evaluation guide")
+]
+
 class PDFProcessor:
-    def __init__(self):
-        self.pdf_directory = Config.PDF_DIRECTORY
+    def __init__(self, pdf_directory: str = None):
+        self.pdf_directory = pdf_directory or Config.PDF_DIRECTORY
         self.chunk_size = Config.CHUNK_SIZE
         self.chunk_overlap = Config.CHUNK_OVERLAP
     
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from a single PDF file."""
-        text = ""
+    def extract_pages_from_pdf(self, pdf_path: str) -> Tuple[List[str], str]:
+        """Extract per-page text and the document title from a single PDF file."""
+        pages = []
+        title = ""
         try:
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
+                if pdf_reader.metadata and pdf_reader.metadata.title:
+                    title = str(pdf_reader.metadata.title).strip()
                 for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+                    pages.append(page.extract_text() or "")
         except Exception as e:
             print(f"Error processing {pdf_path}: {str(e)}")
-        return text
+        return pages, title
     
-    def chunk_text(self, text: str, filename: str) -> List[Dict[str, str]]:
-        """Split text into chunks with metadata."""
-        chunks = []
-        text = text.replace('\n', ' ').strip()
-        
+    def get_document_type(self, filename: str) -> str:
+        """Classify a PDF by its filename."""
+        name = filename.lower()
+        for keyword, doc_type in DOCUMENT_TYPE_KEYWORDS:
+            if keyword in name:
+                return doc_type
+        return "article"
+    
+    def _windows(self, text: str):
+        """Yield (offset of the first kept character, content) for each non-empty overlapping window of text."""
         for i in range(0, len(text), self.chunk_size - self.chunk_overlap):
             chunk = text[i:i + self.chunk_size]
             if chunk.strip():
-                chunks.append({
-                    'content': chunk.strip(),
-                    'source': filename,
-                    'chunk_id': f"{filename}_chunk_{len(chunks)}"
-                })
+                yield i + len(chunk) - len(chunk.lstrip()), chunk.strip()
+    
+    def chunk_pages(self, pages: List[str], filename: str, title: str = "") -> List[Dict]:
+        """Split a document's pages into chunks tagged with title, document type and start page."""
+        # Join pages into one line of text, remembering where each page starts
+        page_starts = []
+        offset = 0
+        for page in pages:
+            page_starts.append(offset)
+            offset += len(page) + 1
+        text = " ".join(pages).replace('\n', ' ')
+        leading = len(text) - len(text.lstrip())
+        
+        doc_type = self.get_document_type(filename)
+        title = title or os.path.splitext(filename)[0]
+        chunks = []
+        for start, chunk in self._windows(text.strip()):
+            chunks.append({
+                'content': chunk,
+                'source': filename,
+                'chunk_id': f"{filename}_chunk_{len(chunks)}",
+                'title': title,
+                'doc_type': doc_type,
+                'page': bisect.bisect_right(page_starts, start + leading)
+            })
         
         return chunks
     
+    def process_pdf(self, filename: str) -> List[Dict]:
+        """Extract and chunk a single PDF from the PDF directory."""
+        pdf_path = os.path.join(self.pdf_directory, filename)
+        pages, title = self.extract_pages_from_pdf(pdf_path)
+        if not "".join(pages).strip():
+            return []
+        return self.chunk_pages(pages, filename, title)
+    
+    def list_pdfs(self) -> List[str]:
+        """List the PDF filenames in the PDF directory."""
+        if not os.path.exists(self.pdf_directory):
+            print(f"PDF directory {self.pdf_directory} not found")
+            return []
+        return [f for f in os.listdir(self.pdf_directory) if f.endswith('.pdf')]
+    
     def process_all_pdfs(self) -> List[Dict[str, str]]:
         """Process all PDFs in the directory and return chunks."""
         all_chunks = []
         
-        if not os.path.exists(self.pdf_directory):
-            print(f"PDF directory {self.pdf_directory} not found")
-            return all_chunks
-        
-        pdf_files = [f for f in os.listdir(self.pdf_directory) if f.endswith('.pdf')]
+        pdf_files = self.list_pdfs()
         
         if not pdf_files:
             print(f"No PDF files found in {self.pdf_directory}")
@@ -54,12 +105,10 @@ class PDFProcessor:
         print(f"Processing {len(pdf_files)} PDF files...")
         
         for filename in pdf_files:
-            pdf_path = os.path.join(self.pdf_directory, filename)
             print(f"Processing: {filename}")
             
-            text = self.extract_text_from_pdf(pdf_path)
-            if text.strip():
-                chunks = self.chunk_text(text, filename)
+            chunks = self.process_pdf(filename)
+            if chunks:
                 all_chunks.extend(chunks)
                 print(f"  - Created {len(chunks)} chunks")
             else:
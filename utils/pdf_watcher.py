@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from config import Config
+
+
+class PDFWatcher:
+    """Poll the PDF directory and incrementally ingest added, modified and deleted PDFs.
+
+    Changes are debounced: a file is only ingested once it has stopped changing
+    for WATCH_DEBOUNCE_SECONDS, so a burst of copies or a slow upload is
+    handled once. Only the affected files are re-embedded. The (mtime, size)
+    of each ingested file is saved next to the index, so PDFs replaced while
+    the app was down are picked up on the next start.
+    """
+
+    def __init__(self, qa_chain, poll_seconds: float = None, debounce_seconds: float = None):
+        self.qa_chain = qa_chain
+        self.vector_store = qa_chain.vector_store
+        self.processor = qa_chain.create_pdf_processor()
+        self.poll_seconds = poll_seconds or Config.WATCH_POLL_SECONDS
+        self.debounce_seconds = Config.WATCH_DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._snapshot: Dict[str, Tuple[float, int]] = {}
+        self.state_path = os.path.join(Config.CHROMA_DB_PATH, f"{self.vector_store.collection_name}.watch.json")
+        # filename -> (mtime, size) of the version that is in the index
+        self._ingested: Dict[str, Tuple[float, int]] = {}
+        # filename -> (first seen, last changed) for changes waiting to be ingested
+        self._pending: Dict[str, Tuple[float, float]] = {}
+        # filename -> consecutive failed ingests, for retry backoff
+        self._failures: Dict[str, int] = {}
+        self.files_ingested = 0
+        self.files_deleted = 0
+        self.last_ingest_seconds = None
+        self.last_error = None
+
+    def _scan(self) -> Dict[str, Tuple[float, int]]:
+        snapshot = {}
+        for filename in self.processor.list_pdfs():
+            try:
+                stat = os.stat(os.path.join(self.processor.pdf_directory, filename))
+            except OSError:
+                continue
+            snapshot[filename] = (stat.st_mtime, stat.st_size)
+        return snapshot
+
+    def _mark(self, filename: str, now: float):
+        first_seen = self._pending.get(filename, (now, now))[0]
+        self._pending[filename] = (first_seen, now)
+
+    def _load_ingested(self) -> Dict[str, Tuple[float, int]]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                return {filename: tuple(stat) for filename, stat in json.load(file).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_ingested(self):
+        with self._lock:
+            data = dict(self._ingested)
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def start(self):
+        """Start watching; files that differ from the index at startup are queued too.
+
+        That covers PDFs added or deleted while the app was down, and ones
+        whose mtime or size no longer match what was last ingested.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._snapshot = self._scan()
+        indexed = set(self.vector_store.get_filter_options()['sources'])
+        ingested = self._load_ingested()
+        now = time.time()
+        with self._lock:
+            for filename in set(self._snapshot) | indexed:
+                current = self._snapshot.get(filename)
+                if current is None or filename not in indexed:
+                    self._mark(filename, now)
+                elif filename not in ingested:
+                    # Indexed before anything was recorded (e.g. the initial build); take it as current
+                    ingested[filename] = current
+                elif ingested[filename] != current:
+                    self._mark(filename, now)
+            self._ingested = {filename: stat for filename, stat in ingested.items() if filename in indexed}
+        self._save_ingested()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"Watching {self.processor.pdf_directory} for PDF changes")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def poll(self):
+        """Detect changes since the last scan and queue them."""
+        snapshot = self._scan()
+        now = time.time()
+        with self._lock:
+            for filename in set(snapshot) | set(self._snapshot):
+                if snapshot.get(filename) != self._snapshot.get(filename):
+                    self._mark(filename, now)
+        self._snapshot = snapshot
+
+    def process_ready(self):
+        """Ingest every queued file that has been quiet for the debounce interval."""
+        # A full rebuild will already pick up the current directory contents
+        job = self.qa_chain.get_refresh_job()
+        if job and job.is_running:
+            return
+
+        now = time.time()
+        with self._lock:
+            ready = [f for f, (_, changed) in self._pending.items() if now - changed >= self.debounce_seconds]
+
+        if not ready:
+            return
+
+        version = self.vector_store.get_version()
+        for filename in ready:
+            started = time.time()
+            try:
+                self._ingest(filename)
+            except Exception as e:
+                print(f"Error ingesting {filename}: {str(e)}")
+                self.last_error = f"{filename}: {str(e)}"
+                with self._lock:
+                    # Keep it queued and retry later, backing off while it keeps failing
+                    failures = self._failures.get(filename, 0) + 1
+                    self._failures[filename] = failures
+                    delay = min(Config.WATCH_RETRY_MAX_SECONDS, self.poll_seconds * 2 ** failures)
+                    first_seen, changed = self._pending.get(filename, (now, now))
+                    self._pending[filename] = (first_seen, max(changed, time.time() + delay - self.debounce_seconds))
+                continue
+
+            self.last_ingest_seconds = time.time() - started
+            self.last_error = None
+            with self._lock:
+                self._failures.pop(filename, None)
+                # Leave it queued if it changed again while we were ingesting it
+                if self._pending.get(filename, (0, 0))[1] <= now:
+                    self._pending.pop(filename, None)
+
+        self._save_ingested()
+        if self.vector_store.get_version() == version:
+            return
+        # Replaced and deleted PDFs leave their text behind; once it dominates the chunk
+        # store, rebuild into a compact index (the refresh re-warms featured answers)
+        if self.vector_store.get_dead_chunk_fraction() > Config.WATCH_COMPACT_DEAD_FRACTION:
+            print(f"Compacting {self.vector_store.collection_name}: rebuilding to reclaim replaced chunks")
+            self.qa_chain.refresh_knowledge_base()
+        else:
+            # Featured answers are tied to the index version; regenerate them only if it changed
+            self.qa_chain._start_featured_warmup()
+
+    def _ingest(self, filename: str):
+        stat = self._snapshot.get(filename)
+        if stat is None:
+            self.vector_store.delete_source(filename)
+            with self._lock:
+                self._ingested.pop(filename, None)
+            self.files_deleted += 1
+            print(f"Removed deleted PDF from knowledge base: {filename}")
+            return
+
+        chunks = self.processor.process_pdf(filename)
+        self.vector_store.replace_source(filename, chunks)
+        with self._lock:
+            self._ingested[filename] = stat
+        self.files_ingested += 1
+        print(f"Ingested {filename}: {len(chunks)} chunks")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+                self.process_ready()
+            except Exception as e:
+                print(f"Error watching {self.processor.pdf_directory}: {str(e)}")
+                self.last_error = str(e)
+            self._stop.wait(self.poll_seconds)
+
+    def metrics(self) -> Dict:
+        """Queue depth, lag and counters for monitoring."""
+        now = time.time()
+        with self._lock:
+            oldest = min((first for first, _ in self._pending.values()), default=None)
+            queue_depth = len(self._pending)
+        return {
+            "queue_depth": queue_depth,
+            "lag_seconds": now - oldest if oldest is not None else 0.0,
+            "files_ingested": self.files_ingested,
+            "files_deleted": self.files_deleted,
+            "last_ingest_seconds": self.last_ingest_seconds,
+            "last_error": self.last_error
+        }
+
+
+# One watcher per knowledge base, shared by every session in the process
+_watchers: Dict[str, PDFWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def start_watcher(qa_chain) -> PDFWatcher:
+    """Start watching the PDF directory for a knowledge base, if not already watched."""
+    key = qa_chain.vector_store.collection_name
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = PDFWatcher(qa_chain)
+            _watchers[key] = watcher
+        watcher.start()
+    return watcher
+
+
+def get_watcher(collection_name: str) -> Optional[PDFWatcher]:
+    with _watchers_lock:
+        return _watchers.get(collection_name)
+
+
+def stop_watcher(collection_name: str):
+    """Stop and forget the watcher for a knowledge base, if any."""
+    with _watchers_lock:
+        watcher = _watchers.pop(collection_name, None)
+    if watcher:
+        watcher.stop()
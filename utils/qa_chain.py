@@ -1,34 +1,44 @@
 import os
+import threading
 from langchain.prompts import PromptTemplate
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
 from config import Config
 from .vector_store import VectorStore
+from .pdf_processor import PDFProcessor
+from .llm_client import create_llm_client
+from .request_coalescer import Flight, SingleFlight, normalize_question
+from .featured_answers import FeaturedAnswerStore
+from .kb_refresh import RefreshJob, start_refresh, get_refresh_job
+from .pdf_watcher import start_watcher, get_watcher
 
-# Try to import replicate, but don't fail if it's not available
-try:
-    import replicate
-    REPLICATE_AVAILABLE = True
-except ImportError:
-    REPLICATE_AVAILABLE = False
-    print("Warning: replicate module not available. Install with: pip install replicate")
+# Shared by every QAChain in the process so concurrent sessions asking the same
+# question against the same knowledge base wait on a single LLM generation
+_answer_flights = SingleFlight()
 
 class QAChain:
-    def __init__(self):
+    def __init__(self, collection_name: str = None, pdf_directory: str = None,
+                 featured_answers_path: str = None, featured_questions: List[str] = None):
         # Set Replicate API token
         if Config.REPLICATE_API_TOKEN:
             os.environ["REPLICATE_API_TOKEN"] = Config.REPLICATE_API_TOKEN
         
-        # Check if dependencies are available
-        if not REPLICATE_AVAILABLE:
-            print("Warning: replicate module not available. Install with: pip install replicate")
+        try:
+            self.llm = create_llm_client()
+        except ImportError as e:
+            print(f"Warning: {str(e)}")
+            self.llm = None
         
         try:
-            self.vector_store = VectorStore()
+            self.vector_store = VectorStore(collection_name)
         except ImportError as e:
             print(f"Warning: {str(e)}")
             self.vector_store = None
             
+        self.pdf_directory = pdf_directory or Config.PDF_DIRECTORY
+        self.featured_answers = FeaturedAnswerStore(featured_answers_path)
+        self.featured_questions = list(Config.FEATURED_QUESTIONS if featured_questions is None else featured_questions)
         self.prompt_template = self._create_prompt_template()
+        self.is_initialized = False
     
     def _create_prompt_template(self) -> PromptTemplate:
         """Create the prompt template for Q&A."""
@@ -46,26 +56,86 @@ Answer: Provide a clear, helpful answer based on the context above. Include spec
             input_variables=["context", "question"]
         )
     
-    def get_answer(self, question: str) -> Dict[str, any]:
-        """Get an answer to a question using the knowledge base."""
+    def get_answer(self, question: str, sources: List[str] = None,
+                   doc_types: List[str] = None) -> Dict[str, any]:
+        """Get an answer to a question using the knowledge base.
+        
+        Pass sources and/or doc_types to answer only from those documents.
+        """
+        try:
+            return self._ask(question, sources, doc_types).wait()
+        except Exception as e:
+            return self._error_result(e)
+    
+    def stream_answer(self, question: str, sources: List[str] = None,
+                      doc_types: List[str] = None) -> Iterator[Dict[str, any]]:
+        """Yield the answer as it is generated, ending with the same result get_answer returns.
+        
+        Partial results carry the answer text so far and no sources. An
+        identical in-flight request is joined and replayed from the start.
+        """
+        try:
+            flight = self._ask(question, sources, doc_types)
+            answer = ""
+            for chunk in flight.iter_chunks():
+                answer += chunk
+                yield {"answer": answer, "sources": [], "error": None}
+            yield flight.wait()
+        except Exception as e:
+            yield self._error_result(e)
+    
+    def _ask(self, question: str, sources: List[str] = None, doc_types: List[str] = None) -> Flight:
+        """Return a flight that produces the answer, finished already if no generation is needed."""
+        # Check if dependencies are available
+        if not self.llm:
+            return Flight.resolved({
+                "answer": f"❌ The {Config.LLM_BACKEND} LLM backend is not available. Please install the required dependency: pip install replicate httpx",
+                "sources": [],
+                "error": "llm backend not available"
+            })
+        
+        if not self.vector_store:
+            return Flight.resolved({
+                "answer": "❌ Vector store is not available. Please install the required dependency: pip install sentence-transformers",
+                "sources": [],
+                "error": "vector store not available"
+            })
+        
+        # Featured questions are answered ahead of time for the current, unscoped index
+        if not sources and not doc_types:
+            featured = self.featured_answers.get(question, self.vector_store.get_version())
+            if featured:
+                return Flight.resolved(featured)
+        
+        # Identical questions against the same knowledge base share one generation
+        return self._submit(question, sources, doc_types)
+    
+    @staticmethod
+    def _error_result(error: Exception) -> Dict[str, any]:
+        return {
+            "answer": f"I encountered an error while processing your question: {str(error)}",
+            "sources": [],
+            "error": str(error)
+        }
+    
+    def _submit(self, question: str, sources: List[str] = None, doc_types: List[str] = None) -> Flight:
+        key = (
+            self.vector_store.collection_name,
+            normalize_question(question),
+            self.vector_store.get_version(),
+            tuple(sorted(sources or ())),
+            tuple(sorted(doc_types or ()))
+        )
+        return _answer_flights.submit(
+            key, lambda flight: self._generate_answer(question, flight, sources, doc_types)
+        )
+    
+    def _generate_answer(self, question: str, flight: Flight, sources: List[str] = None,
+                         doc_types: List[str] = None) -> Dict[str, any]:
+        """Retrieve context and generate an answer, publishing partial output to the flight."""
         try:
-            # Check if dependencies are available
-            if not REPLICATE_AVAILABLE:
-                return {
-                    "answer": "❌ The Replicate API is not available. Please install the required dependency: pip install replicate",
-                    "sources": [],
-                    "error": "replicate module not available"
-                }
-            
-            if not self.vector_store:
-                return {
-                    "answer": "❌ Vector store is not available. Please install the required dependency: pip install sentence-transformers",
-                    "sources": [],
-                    "error": "vector store not available"
-                }
-            
             # Retrieve relevant documents
-            docs = self.vector_store.similarity_search(question)
+            docs = self.vector_store.search(question, sources=sources, doc_types=doc_types)
             
             if not docs:
                 return {
@@ -76,44 +146,27 @@ Answer: Provide a clear, helpful answer based on the context above. Include spec
             
             # Prepare context from retrieved documents
             context = "\n\n".join([
-                f"Document: {doc['metadata'].get('source', 'Unknown')}\n{doc['content']}"
+                f"Document: {doc.source}\n{doc.content}"
                 for doc in docs
             ])
             
-            # Generate answer using Replicate
+            # Generate answer using the configured LLM backend
             prompt = self.prompt_template.format(context=context, question=question)
-            
-            response = replicate.run(
-                Config.CHAT_MODEL,
-                input={
-                    "prompt": prompt,
-                    "temperature": 0.1,
-                    "max_tokens": 1000
-                }
-            )
-            
-            # Handle response - Replicate may return a list of strings or FileOutput objects
-            if isinstance(response, list):
-                # Convert FileOutput objects to strings if needed
-                answer = "".join([str(item) for item in response]).strip()
-            else:
-                answer = str(response).strip()
+            for chunk in self.llm.stream(prompt):
+                flight.publish(chunk)
+            answer = "".join(flight.chunks).strip()
             
             # Prepare sources
-            sources = list(set([doc['metadata'].get('source', 'Unknown') for doc in docs]))
+            cited = list(set([doc.source for doc in docs]))
             
             return {
                 "answer": answer,
-                "sources": sources,
+                "sources": cited,
                 "error": None
             }
             
         except Exception as e:
-            return {
-                "answer": f"I encountered an error while processing your question: {str(e)}",
-                "sources": [],
-                "error": str(e)
-            }
+            return self._error_result(e)
     
     def initialize_knowledge_base(self, force_rebuild: bool = False):
         """Initialize the knowledge base from PDFs."""
@@ -122,32 +175,106 @@ Answer: Provide a clear, helpful answer based on the context above. Include spec
                 print("❌ Vector store is not available. Please install sentence-transformers")
                 return False
             
+            # A forced rebuild is the shared background refresh (built beside the live
+            # collection and swapped in when complete); wait so the caller sees the result
+            if force_rebuild:
+                job = self.refresh_knowledge_base()
+                job.wait()
+                if job.state != "done":
+                    return False
+                self._start_watcher()
+                self.is_initialized = True
+                return True
+            
             # Check if collection already has documents
-            if not force_rebuild and self.vector_store.get_collection_count() > 0:
+            if self.vector_store.get_collection_count() > 0:
                 print(f"Knowledge base already contains {self.vector_store.get_collection_count()} documents")
+                self._start_featured_warmup()
+                self._start_watcher()
+                self.is_initialized = True
                 return True
             
-            # Import here to avoid circular imports
-            from .pdf_processor import PDFProcessor
-            
             # Process PDFs
-            processor = PDFProcessor()
+            processor = self.create_pdf_processor()
             chunks = processor.process_all_pdfs()
             
             if not chunks:
                 print("No chunks created from PDFs")
                 return False
             
-            # Reset collection if force rebuild
-            if force_rebuild:
-                self.vector_store.reset_collection()
-            
-            # Add to vector store
             self.vector_store.add_documents(chunks)
             
             print(f"Knowledge base initialized with {len(chunks)} chunks")
+            self._start_featured_warmup()
+            self._start_watcher()
+            self.is_initialized = True
             return True
             
         except Exception as e:
             print(f"Error initializing knowledge base: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+    
+    def create_pdf_processor(self) -> PDFProcessor:
+        """Create a PDF processor for this knowledge base's PDF directory."""
+        return PDFProcessor(self.pdf_directory)
+    
+    def refresh_knowledge_base(self) -> Optional[RefreshJob]:
+        """Start rebuilding the knowledge base in the background; queries keep using the old one."""
+        if not self.vector_store:
+            print("❌ Vector store is not available. Please install sentence-transformers")
+            return None
+        return start_refresh(self)
+    
+    def get_refresh_job(self) -> Optional[RefreshJob]:
+        """Get the latest background refresh of this knowledge base, if any."""
+        if not self.vector_store:
+            return None
+        return get_refresh_job(self.vector_store.collection_name)
+    
+    def _start_watcher(self):
+        if Config.WATCH_PDF_DIRECTORY:
+            start_watcher(self)
+    
+    def get_watcher_metrics(self) -> Optional[Dict]:
+        """Get queue depth, lag and counters of the PDF directory watcher, if it is running."""
+        watcher = get_watcher(self.vector_store.collection_name) if self.vector_store else None
+        return watcher.metrics() if watcher else None
+    
+    def get_filter_options(self) -> Dict[str, List[str]]:
+        """Get the sources and document types a question can be scoped to."""
+        if not self.vector_store:
+            return {"sources": [], "doc_types": []}
+        return self.vector_store.get_filter_options()
+    
+    def _start_featured_warmup(self):
+        if Config.WARM_FEATURED_ANSWERS and self.llm and self.featured_questions:
+            threading.Thread(target=self.warm_featured_answers, daemon=True).start()
+    
+    def warm_featured_answers(self, questions: List[str] = None) -> int:
+        """Generate and persist answers for this knowledge base's featured questions against the current index."""
+        questions = questions or self.featured_questions
+        if not questions:
+            return 0
+        kb_version = self.vector_store.get_version()
+        if self.featured_answers.has_all(questions, kb_version):
+            print("Featured answers are up to date")
+            return len(questions)
+        
+        print(f"Warming up answers for {len(questions)} featured questions...")
+        answers = {}
+        for question in questions:
+            # Goes through the coalescer, so a user clicking the same question joins this run
+            result = self._submit(question).wait()
+            if result["error"] is None:
+                answers[question] = result
+            else:
+                print(f"  - Skipped '{question}': {result['error']}")
+        
+        # Don't persist answers if the index was rebuilt while we were generating them
+        if self.vector_store.get_version() != kb_version:
+            print("Knowledge base changed during warm-up; discarding featured answers")
+            return 0
+        
+        self.featured_answers.save(kb_version, answers)
+        print(f"Stored {len(answers)} featured answers")
+        return len(answers)
\ No newline at end of file
@@ -0,0 +1,99 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterator, List
+
+
+def normalize_question(question: str) -> str:
+    """Collapse case, whitespace and trailing punctuation so equivalent questions share a key."""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+class Flight:
+    """A single in-flight computation whose partial and final output can be shared."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.chunks: List[str] = []
+        self.done = False
+        self.result = None
+        self.error = None
+
+    @classmethod
+    def resolved(cls, result: Any) -> "Flight":
+        """A flight that is already finished with result."""
+        flight = cls()
+        flight.finish(result=result)
+        return flight
+
+    def publish(self, chunk: str):
+        """Append a piece of partial output and wake up anyone streaming it."""
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self, result: Any = None, error: BaseException = None):
+        with self._cond:
+            self.result = result
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    def wait(self, timeout: float = None) -> Any:
+        """Block until the computation finishes and return (or re-raise) its outcome."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.done, timeout=timeout):
+                raise TimeoutError("Timed out waiting for in-flight request")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def iter_chunks(self) -> Iterator[str]:
+        """Yield every published chunk, from the start, as it becomes available."""
+        index = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: index < len(self.chunks) or self.done)
+                pending = self.chunks[index:]
+                finished = self.done
+            for chunk in pending:
+                yield chunk
+            index += len(pending)
+            if finished and index >= len(self.chunks):
+                return
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key.
+
+    The first caller for a key starts the computation on a worker thread;
+    everyone who asks for the same key while it runs joins that flight
+    instead of starting their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Flight] = {}
+
+    def submit(self, key: Hashable, fn: Callable[[Flight], Any]) -> Flight:
+        """Return the in-flight computation for key, starting fn(flight) if there is none."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight
+            flight = Flight()
+            self._flights[key] = flight
+
+        thread = threading.Thread(target=self._run, args=(key, flight, fn), daemon=True)
+        thread.start()
+        return flight
+
+    def _run(self, key: Hashable, flight: Flight, fn: Callable[[Flight], Any]):
+        try:
+            result = fn(flight)
+        except BaseException as e:
+            flight.finish(error=e)
+        else:
+            flight.finish(result=result)
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
@@ -0,0 +1,299 @@
+"""Sweep chunking and retrieval settings against a labelled question set.
+
+Scores retrieval only (hit rate and MRR against the PDFs each question should
+be answered from), so no LLM calls are made. PDF extractions and chunk
+embeddings are cached on disk, so re-running a sweep, or adding grid points
+that share chunks, only embeds text it hasn't seen. Reported build times are
+estimated from an uncached sample instead, so they don't depend on what
+happened to be cached.
+
+Usage:
+    python -m utils.retrieval_sweep --chunk-sizes 500,1000,1500 --overlaps 100,200 \\
+        --top-k 3,5 --modes similarity,mmr --min-hit-rate 0.8 --output sweep.csv
+"""
+import os
+import csv
+import json
+import time
+import hashlib
+import argparse
+import itertools
+import numpy as np
+from typing import Dict, List, Tuple
+from config import Config
+from .pdf_processor import PDFProcessor
+from .vector_store import get_embedding_model, maximal_marginal_relevance
+
+
+class ExtractionCache:
+    """Per-page PDF text, cached by file path, size and modification time."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = os.path.join(cache_dir, "extractions")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_pages(self, processor: PDFProcessor, filename: str) -> Tuple[List[str], str]:
+        pdf_path = os.path.join(processor.pdf_directory, filename)
+        stat = os.stat(pdf_path)
+        key = hashlib.sha1(f"{os.path.abspath(pdf_path)}:{stat.st_size}:{stat.st_mtime}".encode()).hexdigest()
+        cache_path = os.path.join(self.cache_dir, f"{key}.json")
+        if os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as file:
+                cached = json.load(file)
+            return cached["pages"], cached["title"]
+
+        pages, title = processor.extract_pages_from_pdf(pdf_path)
+        with open(cache_path, 'w', encoding='utf-8') as file:
+            json.dump({"pages": pages, "title": title}, file, ensure_ascii=False)
+        return pages, title
+
+
+class EmbeddingCache:
+    """Chunk embeddings keyed by a hash of their text, persisted per embedding model."""
+
+    def __init__(self, cache_dir: str, model_name: str):
+        safe_name = model_name.replace("/", "_")
+        self.path = os.path.join(cache_dir, f"embeddings_{safe_name}.npz")
+        self.model_name = model_name
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._dirty = False
+        if os.path.exists(self.path):
+            data = np.load(self.path)
+            self._vectors = dict(zip(data["keys"].tolist(), data["vectors"]))
+
+    def encode(self, texts: List[str]) -> Tuple[np.ndarray, int]:
+        """Return embeddings for texts and how many had to be computed."""
+        keys = [hashlib.sha1(text.encode('utf-8')).hexdigest() for text in texts]
+        missing = sorted({key: text for key, text in zip(keys, texts) if key not in self._vectors}.items())
+        if missing:
+            vectors = get_embedding_model(self.model_name).encode(
+                [text for _, text in missing], batch_size=Config.EMBEDDING_BATCH_SIZE
+            )
+            for (key, _), vector in zip(missing, vectors):
+                self._vectors[key] = np.asarray(vector, dtype=np.float32)
+            self._dirty = True
+        return np.stack([self._vectors[key] for key in keys]), len(missing)
+
+    def seconds_per_chunk(self, texts: List[str], sample_size: int = None) -> float:
+        """Time an uncached encode of an evenly spaced sample of texts, per text."""
+        sample_size = sample_size or Config.EMBEDDING_BATCH_SIZE
+        sample = texts[::max(1, len(texts) // sample_size)][:sample_size]
+        started = time.perf_counter()
+        get_embedding_model(self.model_name).encode(sample, batch_size=Config.EMBEDDING_BATCH_SIZE)
+        return (time.perf_counter() - started) / len(sample)
+
+    def save(self):
+        if not self._dirty:
+            return
+        keys = list(self._vectors)
+        np.savez(self.path, keys=np.array(keys), vectors=np.stack([self._vectors[key] for key in keys]))
+        self._dirty = False
+
+
+def load_questions(path: str) -> List[Dict]:
+    """Load [{"question": ..., "sources": [pdf filenames that answer it]}, ...]."""
+    with open(path, 'r', encoding='utf-8') as file:
+        questions = json.load(file)
+    for item in questions:
+        if not item.get("question") or not item.get("sources"):
+            raise ValueError(f"Each labelled question needs 'question' and 'sources': {item}")
+    return questions
+
+
+def build_chunks(pdf_directory: str, chunk_size: int, chunk_overlap: int,
+                 extractions: ExtractionCache) -> List[Dict]:
+    processor = PDFProcessor(pdf_directory)
+    processor.chunk_size = chunk_size
+    processor.chunk_overlap = chunk_overlap
+    chunks = []
+    for filename in processor.list_pdfs():
+        pages, title = extractions.get_pages(processor, filename)
+        if "".join(pages).strip():
+            chunks.extend(processor.chunk_pages(pages, filename, title))
+    return chunks
+
+
+def rank_sources(query_vector: np.ndarray, embeddings: np.ndarray, sources: List[str],
+                 k: int, mode: str) -> List[str]:
+    """Return the sources of the top-k chunks, ranked as VectorStore.search would."""
+    # Embeddings are unit-normalized, so cosine ranking matches Chroma's L2 ranking
+    scores = embeddings @ query_vector
+    if mode == "mmr":
+        fetch_k = min(max(Config.MMR_FETCH_K, k), len(scores))
+        candidates = np.argpartition(-scores, fetch_k - 1)[:fetch_k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        picked = maximal_marginal_relevance(query_vector, embeddings[candidates], k, Config.MMR_LAMBDA)
+        top = candidates[picked]
+    else:
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+    return [sources[i] for i in top]
+
+
+def score(questions: List[Dict], query_vectors: np.ndarray, embeddings: np.ndarray,
+          sources: List[str], k: int, mode: str) -> Dict[str, float]:
+    hits = 0
+    reciprocal_ranks = 0.0
+    started = time.perf_counter()
+    for item, query_vector in zip(questions, query_vectors):
+        expected = set(item["sources"])
+        ranked = rank_sources(query_vector, embeddings, sources, k, mode)
+        for rank, source in enumerate(ranked, start=1):
+            if source in expected:
+                hits += 1
+                reciprocal_ranks += 1.0 / rank
+                break
+    elapsed = time.perf_counter() - started
+    return {
+        "hit_rate": hits / len(questions),
+        "mrr": reciprocal_ranks / len(questions),
+        "search_ms": elapsed / len(questions) * 1000
+    }
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def run_sweep(questions: List[Dict], chunk_sizes: List[int], overlaps: List[int], top_ks: List[int],
+              models: List[str], modes: List[str], pdf_directory: str = None,
+              cache_dir: str = None) -> List[Dict]:
+    """Build an index per (model, chunk size, overlap) and score every top-k/mode against it.
+
+    build_seconds is chunking time plus the embedding time for every chunk,
+    estimated from an uncached sample. PDF extraction is the same for every
+    configuration, so it is left out.
+    """
+    pdf_directory = pdf_directory or Config.PDF_DIRECTORY
+    cache_dir = cache_dir or Config.SWEEP_CACHE_DIR
+    extractions = ExtractionCache(cache_dir)
+    results = []
+
+    # Extract every PDF up front so chunk_seconds measures chunking alone
+    processor = PDFProcessor(pdf_directory)
+    for filename in processor.list_pdfs():
+        extractions.get_pages(processor, filename)
+
+    for model in models:
+        embedding_cache = EmbeddingCache(cache_dir, model)
+        query_vectors = normalize(get_embedding_model(model).encode([item["question"] for item in questions]))
+
+        for chunk_size, chunk_overlap in itertools.product(chunk_sizes, overlaps):
+            if chunk_overlap >= chunk_size:
+                print(f"Skipping chunk_size={chunk_size}, overlap={chunk_overlap}: overlap must be smaller")
+                continue
+
+            started = time.perf_counter()
+            chunks = build_chunks(pdf_directory, chunk_size, chunk_overlap, extractions)
+            chunk_seconds = time.perf_counter() - started
+            if not chunks:
+                raise ValueError(f"No chunks created from PDFs in {pdf_directory}")
+
+            texts = [chunk['content'] for chunk in chunks]
+            embed_seconds = embedding_cache.seconds_per_chunk(texts) * len(texts)
+            embeddings, embedded = embedding_cache.encode(texts)
+            embeddings = normalize(embeddings)
+            embedding_cache.save()
+
+            sources = [chunk['source'] for chunk in chunks]
+            index_bytes = embeddings.nbytes + sum(len(chunk['content'].encode('utf-8')) for chunk in chunks)
+
+            for k, mode in itertools.product(top_ks, modes):
+                row = {
+                    "embedding_model": model,
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": chunk_overlap,
+                    "top_k": k,
+                    "retrieval_mode": mode,
+                    "chunks": len(chunks),
+                    "index_mb": round(index_bytes / 1024 / 1024, 2),
+                    "chunk_seconds": round(chunk_seconds, 2),
+                    "embed_seconds": round(embed_seconds, 2),
+                    "build_seconds": round(chunk_seconds + embed_seconds, 2),
+                    "newly_embedded": embedded
+                }
+                row.update({key: round(value, 4) for key, value in
+                            score(questions, query_vectors, embeddings, sources, k, mode).items()})
+                results.append(row)
+                print(f"  {model} size={chunk_size} overlap={chunk_overlap} k={k} {mode}: "
+                      f"hit rate {row['hit_rate']:.2f}, MRR {row['mrr']:.2f}")
+
+    return results
+
+
+def pick_fastest(results: List[Dict], min_hit_rate: float, min_mrr: float = 0.0):
+    """The fastest configuration meeting the quality bar, judged by deterministic cost proxies.
+
+    search_ms is a brute-force NumPy timing, not how Chroma searches, and is
+    mostly noise, so it isn't used. Instead: smallest index, then fewest
+    chunks sent to the LLM, then plain similarity over MMR (no over-fetch).
+    """
+    passing = [row for row in results if row["hit_rate"] >= min_hit_rate and row["mrr"] >= min_mrr]
+    if not passing:
+        return None
+    return min(passing, key=lambda row: (row["index_mb"], row["chunks"], row["top_k"],
+                                         row["retrieval_mode"] != "similarity"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep chunking and retrieval settings without calling the LLM.")
+    parser.add_argument("--questions", default=Config.SWEEP_QUESTIONS_PATH,
+                        help="JSON list of {question, sources} labels")
+    parser.add_argument("--pdf-directory", default=Config.PDF_DIRECTORY)
+    parser.add_argument("--chunk-sizes", default=str(Config.CHUNK_SIZE))
+    parser.add_argument("--overlaps", default=str(Config.CHUNK_OVERLAP))
+    parser.add_argument("--top-k", default=str(Config.TOP_K_DOCUMENTS))
+    parser.add_argument("--models", default=Config.EMBEDDING_MODEL)
+    parser.add_argument("--modes", default=Config.RETRIEVAL_MODE, help="similarity, mmr or both")
+    parser.add_argument("--min-hit-rate", type=float, default=0.8)
+    parser.add_argument("--min-mrr", type=float, default=0.0)
+    parser.add_argument("--cache-dir", default=Config.SWEEP_CACHE_DIR)
+    parser.add_argument("--output", help="Write results to this .csv or .json file")
+    args = parser.parse_args()
+
+    def int_list(value):
+        return [int(item) for item in value.split(",") if item.strip()]
+
+    def str_list(value):
+        return [item.strip() for item in value.split(",") if item.strip()]
+
+    questions = load_questions(args.questions)
+    print(f"Scoring {len(questions)} labelled questions...")
+    results = run_sweep(
+        questions,
+        chunk_sizes=int_list(args.chunk_sizes),
+        overlaps=int_list(args.overlaps),
+        top_ks=int_list(args.top_k),
+        models=str_list(args.models),
+        modes=str_list(args.modes),
+        pdf_directory=args.pdf_directory,
+        cache_dir=args.cache_dir
+    )
+
+    if not results:
+        print("No configurations were evaluated")
+        return
+
+    if args.output:
+        if args.output.endswith(".json"):
+            with open(args.output, 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+        else:
+            with open(args.output, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=list(results[0]))
+                writer.writeheader()
+                writer.writerows(results)
+        print(f"Wrote {len(results)} results to {args.output}")
+
+    best = pick_fastest(results, args.min_hit_rate, args.min_mrr)
+    if best:
+        print("\nFastest configuration meeting the quality bar:")
+        for key, value in best.items():
+            print(f"  {key}: {value}")
+    else:
+        print(f"\nNo configuration reached hit rate {args.min_hit_rate} and MRR {args.min_mrr}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List
+from config import Config
+from .featured_answers import load_featured_questions
+from .llm_client import LLMClient, LLMError
+from .pdf_watcher import stop_watcher
+from .qa_chain import QAChain
+
+TENANT_NAME_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,30}$")
+
+
+class TenantLimitError(LLMError):
+    """Raised when a tenant is over its concurrency or rate limit."""
+
+
+class TenantStats:
+    """Latency and estimated cost counters for one tenant's LLM calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, latency: float, prompt: str, completion: str, failed: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.failures += int(failed)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            # Rough token estimate (~4 characters per token); good enough for cost tracking
+            self.prompt_tokens += len(prompt) // 4
+            self.completion_tokens += len(completion) // 4
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            cost = (self.prompt_tokens / 1000 * Config.LLM_INPUT_COST_PER_1K_TOKENS
+                    + self.completion_tokens / 1000 * Config.LLM_OUTPUT_COST_PER_1K_TOKENS)
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "avg_latency_seconds": self.total_latency / self.calls if self.calls else 0.0,
+                "max_latency_seconds": self.max_latency,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "estimated_cost_usd": round(cost, 4)
+            }
+
+
+class RateLimiter:
+    """Token bucket allowing `per_minute` calls with bursts of up to the same size."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class TenantLLMClient(LLMClient):
+    """Wrap a tenant's LLM client with its concurrency limit, rate limit and counters."""
+
+    def __init__(self, tenant: str, inner: LLMClient, stats: TenantStats,
+                 concurrency: threading.BoundedSemaphore, rate_limiter: RateLimiter):
+        self.tenant = tenant
+        self.inner = inner
+        self.stats = stats
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter
+        self.name = inner.name
+
+    def _admit(self):
+        if not self.rate_limiter.try_acquire():
+            self.stats.record_rejected()
+            raise TenantLimitError(f"Team '{self.tenant}' is over its rate limit; please try again shortly")
+        if not self.concurrency.acquire(timeout=Config.TENANT_QUEUE_TIMEOUT):
+            self.stats.record_rejected()
+            raise TenantLimitError(f"Team '{self.tenant}' has too many questions in progress; please try again shortly")
+
+    def generate(self, prompt: str) -> str:
+        self._admit()
+        started = time.monotonic()
+        try:
+            answer = self.inner.generate(prompt)
+        except Exception:
+            self.stats.record(time.monotonic() - started, prompt, "", failed=True)
+            raise
+        finally:
+            self.concurrency.release()
+        self.stats.record(time.monotonic() - started, prompt, answer)
+        return answer
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        self._admit()
+        started = time.monotonic()
+        produced = []
+        failed = True
+        try:
+            for chunk in self.inner.stream(prompt):
+                produced.append(chunk)
+                yield chunk
+            failed = False
+        finally:
+            self.concurrency.release()
+            self.stats.record(time.monotonic() - started, prompt, "".join(produced), failed=failed)
+
+
+class TenantRegistry:
+    """Per-team knowledge bases, with a bounded LRU of loaded indexes.
+
+    The default tenant is the original single corpus (Config.COLLECTION_NAME and
+    Config.PDF_DIRECTORY). Every other tenant is a subdirectory of
+    Config.TENANTS_DIRECTORY with its own collection. Loaded tenants beyond
+    MAX_LOADED_TENANTS are evicted least-recently-used first; limits and
+    counters survive eviction. Chroma's own index cache is capped separately
+    by Config.CHROMA_MEMORY_LIMIT_BYTES.
+    """
+
+    def __init__(self, max_loaded: int = None, chain_factory: Callable[..., object] = None):
+        self.max_loaded = max_loaded or Config.MAX_LOADED_TENANTS
+        self.chain_factory = chain_factory or QAChain
+        self._lock = threading.Lock()
+        self._loaded: "OrderedDict[str, object]" = OrderedDict()
+        # Held while a tenant loads, so concurrent first requests build it once
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._stats: Dict[str, TenantStats] = {}
+        self._concurrency: Dict[str, threading.BoundedSemaphore] = {}
+        self._rate_limiters: Dict[str, RateLimiter] = {}
+
+    def list_tenants(self) -> List[str]:
+        tenants = [Config.DEFAULT_TENANT]
+        if os.path.isdir(Config.TENANTS_DIRECTORY):
+            tenants += sorted(
+                name for name in os.listdir(Config.TENANTS_DIRECTORY)
+                if os.path.isdir(os.path.join(Config.TENANTS_DIRECTORY, name))
+                and TENANT_NAME_PATTERN.match(name) and name != Config.DEFAULT_TENANT
+            )
+        return tenants
+
+    def _chain_options(self, tenant: str) -> Dict:
+        if tenant == Config.DEFAULT_TENANT:
+            return {
+                "collection_name": Config.COLLECTION_NAME,
+                "pdf_directory": Config.PDF_DIRECTORY,
+                "featured_answers_path": Config.FEATURED_ANSWERS_PATH,
+                "featured_questions": Config.FEATURED_QUESTIONS
+            }
+        collection_name = f"{Config.COLLECTION_NAME}_{tenant}"
+        pdf_directory = os.path.join(Config.TENANTS_DIRECTORY, tenant)
+        return {
+            "collection_name": collection_name,
+            "pdf_directory": pdf_directory,
+            "featured_answers_path": os.path.join(Config.CHROMA_DB_PATH, f"{collection_name}.featured_answers.json"),
+            # Other teams only warm up the questions they list themselves
+            "featured_questions": load_featured_questions(
+                os.path.join(pdf_directory, Config.FEATURED_QUESTIONS_FILENAME)
+            )
+        }
+
+    def get(self, tenant: str = None):
+        """Get the QAChain for a tenant, loading it (and evicting the least recently used) if needed."""
+        tenant = tenant or Config.DEFAULT_TENANT
+        if not TENANT_NAME_PATTERN.match(tenant):
+            raise ValueError(f"Invalid team name '{tenant}'")
+
+        with self._lock:
+            qa_chain = self._loaded.get(tenant)
+            if qa_chain is not None:
+                self._loaded.move_to_end(tenant)
+                return qa_chain
+            load_lock = self._load_locks.setdefault(tenant, threading.Lock())
+
+        # Loading opens the collection and embedding model; don't hold up other teams meanwhile
+        with load_lock:
+            with self._lock:
+                qa_chain = self._loaded.get(tenant)
+                if qa_chain is not None:
+                    self._loaded.move_to_end(tenant)
+                    return qa_chain
+
+            qa_chain = self.chain_factory(**self._chain_options(tenant))
+            if qa_chain.llm:
+                with self._lock:
+                    limits = (
+                        self._stats.setdefault(tenant, TenantStats()),
+                        self._concurrency.setdefault(
+                            tenant, threading.BoundedSemaphore(Config.TENANT_MAX_CONCURRENT_LLM_CALLS)
+                        ),
+                        self._rate_limiters.setdefault(tenant, RateLimiter(Config.TENANT_LLM_CALLS_PER_MINUTE))
+                    )
+                qa_chain.llm = TenantLLMClient(tenant, qa_chain.llm, *limits)
+
+            evicted = []
+            with self._lock:
+                self._loaded[tenant] = qa_chain
+                while len(self._loaded) > self.max_loaded:
+                    evicted.append(self._loaded.popitem(last=False))
+
+        for evicted_tenant, evicted_chain in evicted:
+            with self._lock:
+                if evicted_tenant in self._loaded:
+                    continue  # loaded again already; its watcher is live
+            if evicted_chain.vector_store:
+                stop_watcher(evicted_chain.vector_store.collection_name)
+            print(f"Unloaded knowledge base for team: {evicted_tenant}")
+        return qa_chain
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Latency and cost counters for every tenant that has made LLM calls."""
+        with self._lock:
+            stats = dict(self._stats)
+        return {tenant: tenant_stats.snapshot() for tenant, tenant_stats in stats.items()}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_tenant_registry() -> TenantRegistry:
+    """Get the process-wide tenant registry shared by every session."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TenantRegistry()
+        return _registry
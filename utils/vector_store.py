@@ -1,7 +1,16 @@
+import os
+import time
+import uuid
+import threading
+import numpy as np
 import chromadb
 from chromadb.config import Settings
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from config import Config
+from .chunk_store import ChunkStore, ChunkRecord
+
+# Chunk fields copied into Chroma metadata so searches can be filtered on them
+METADATA_FIELDS = ('source', 'chunk_id', 'title', 'doc_type', 'page')
 
 # Try to import sentence_transformers, but don't fail if it's not available
 try:
@@ -11,88 +20,370 @@ except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
     print("Warning: sentence_transformers module not available. Install with: pip install sentence-transformers")
 
+def maximal_marginal_relevance(query_embedding, embeddings, k: int, lambda_mult: float) -> List[int]:
+    """Pick k candidate indices balancing relevance to the query against redundancy.
+    
+    All cosine similarities are computed up front in two matrix products; each
+    greedy step is then a vectorized update over the candidate set.
+    """
+    candidates = np.asarray(embeddings, dtype=np.float32)
+    if len(candidates) == 0 or k <= 0:
+        return []
+    query = np.asarray(query_embedding, dtype=np.float32)
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = query / max(np.linalg.norm(query), 1e-12)
+    
+    relevance = candidates @ query
+    redundancy = candidates @ candidates.T
+    
+    selected = [int(np.argmax(relevance))]
+    max_similarity = redundancy[selected[0]].copy()
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_similarity, redundancy[best], out=max_similarity)
+    return selected
+
+# Embedding models are large; share one per model name across every VectorStore in the process
+_embedding_models = {}
+_embedding_models_lock = threading.Lock()
+
+def get_embedding_model(name: str = None):
+    name = name or Config.EMBEDDING_MODEL
+    with _embedding_models_lock:
+        if name not in _embedding_models:
+            _embedding_models[name] = SentenceTransformer(name)
+        return _embedding_models[name]
+
+class LiveIndex:
+    """A Chroma collection and its chunk store, swapped in and out together."""
+    
+    __slots__ = ('name', 'collection', 'chunks', 'version')
+    
+    def __init__(self, name: str, collection, chunks: ChunkStore):
+        self.name = name
+        self.collection = collection
+        self.chunks = chunks
+        self.version = (collection.metadata or {}).get("kb_version", "initial")
+
 class VectorStore:
-    def __init__(self):
+    def __init__(self, collection_name: str = None):
         if not SENTENCE_TRANSFORMERS_AVAILABLE:
             raise ImportError("sentence_transformers is required. Install with: pip install sentence-transformers")
             
         self.client = chromadb.PersistentClient(
             path=Config.CHROMA_DB_PATH,
-            settings=Settings(allow_reset=True)
+            settings=Settings(
+                allow_reset=True,
+                # Every VectorStore shares this client; without a policy it keeps every
+                # collection it has ever opened in memory, including unloaded teams'
+                chroma_segment_cache_policy="LRU",
+                chroma_memory_limit_bytes=Config.CHROMA_MEMORY_LIMIT_BYTES
+            )
         )
-        self.collection_name = Config.COLLECTION_NAME
-        self.embeddings = SentenceTransformer(Config.EMBEDDING_MODEL)
-        self.collection = None
+        self.collection_name = collection_name or Config.COLLECTION_NAME
+        self.embeddings = get_embedding_model()
+        # Names the physical collection currently serving traffic; rewritten on every swap
+        self.pointer_path = os.path.join(Config.CHROMA_DB_PATH, f"{self.collection_name}.active")
+        self._swap_lock = threading.Lock()
+        self._pointer_mtime = None
+        self._filter_options = None
+        self.index = None
         self._initialize_collection()
     
     def _initialize_collection(self):
         """Initialize or get existing collection."""
+        self._pointer_mtime = self._get_pointer_mtime()
+        self.index = self._open_index(self._read_pointer())
+    
+    def _open_index(self, name: str) -> LiveIndex:
         try:
-            self.collection = self.client.get_collection(name=self.collection_name)
-            print(f"Loaded existing collection: {self.collection_name}")
+            collection = self.client.get_collection(name=name)
+            print(f"Loaded existing collection: {name}")
         except Exception:
-            self.collection = self.client.create_collection(name=self.collection_name)
-            print(f"Created new collection: {self.collection_name}")
+            collection = self.client.create_collection(name=name)
+            print(f"Created new collection: {name}")
+        return LiveIndex(name, collection, ChunkStore(name))
+    
+    def _get_pointer_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.pointer_path)
+        except OSError:
+            return None
     
-    def add_documents(self, chunks: List[Dict[str, str]]):
-        """Add document chunks to the vector store."""
+    def _read_pointer(self) -> str:
+        try:
+            with open(self.pointer_path, 'r', encoding='utf-8') as file:
+                return file.read().strip() or self.collection_name
+        except OSError:
+            return self.collection_name
+    
+    def _write_pointer(self, name: str):
+        tmp_path = f"{self.pointer_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(name)
+        os.replace(tmp_path, self.pointer_path)
+    
+    def _live(self) -> LiveIndex:
+        """Return the live index, following swaps made by other sessions or processes."""
+        mtime = self._get_pointer_mtime()
+        if mtime != self._pointer_mtime:
+            with self._swap_lock:
+                if mtime != self._pointer_mtime:
+                    self._pointer_mtime = mtime
+                    name = self._read_pointer()
+                    if name != self.index.name:
+                        self.index = self._open_index(name)
+        return self.index
+    
+    @property
+    def collection(self):
+        return self._live().collection
+    
+    @property
+    def chunks(self) -> ChunkStore:
+        return self._live().chunks
+    
+    def _bump_version(self, index: LiveIndex):
+        """Record that the collection contents changed."""
+        index.version = uuid.uuid4().hex[:12]
+        index.collection.modify(metadata={"kb_version": index.version})
+    
+    def add_documents(self, chunks: List[Dict[str, str]], index: LiveIndex = None,
+                      progress: Callable[[int, int], None] = None):
+        """Add document chunks to the vector store (or to the given index)."""
         if not chunks:
             print("No chunks to add")
             return
         
+        index = index or self._live()
         print(f"Adding {len(chunks)} chunks to vector store...")
         
-        # Extract texts and metadata
-        texts = [chunk['content'] for chunk in chunks]
-        metadatas = [{'source': chunk['source'], 'chunk_id': chunk['chunk_id']} for chunk in chunks]
-        ids = [chunk['chunk_id'] for chunk in chunks]
-        
-        # Generate embeddings
-        print("Generating embeddings...")
-        embeddings = self.embeddings.encode(texts).tolist()
-        
-        # Add to collection
-        self.collection.add(
-            embeddings=embeddings,
-            documents=texts,
-            metadatas=metadatas,
-            ids=ids
-        )
+        # Embed and store in batches so progress can be reported while a large rebuild runs
+        batch_size = Config.EMBEDDING_BATCH_SIZE
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            
+            # Extract texts and metadata
+            texts = [chunk['content'] for chunk in batch]
+            metadatas = [
+                {field: chunk[field] for field in METADATA_FIELDS if chunk.get(field) is not None}
+                for chunk in batch
+            ]
+            ids = [chunk['chunk_id'] for chunk in batch]
+            
+            # Text goes to the chunk store; Chroma only keeps vectors, metadata and the row id
+            rows = index.chunks.append(texts, [chunk['source'] for chunk in batch])
+            for metadata, row in zip(metadatas, rows):
+                metadata['row'] = row
+            
+            # Generate embeddings
+            embeddings = self.embeddings.encode(texts).tolist()
+            
+            # Add to collection; upsert so a re-ingested PDF can replace chunks with the same ids
+            index.collection.upsert(
+                embeddings=embeddings,
+                metadatas=metadatas,
+                ids=ids
+            )
+            if progress:
+                progress(start + len(batch), len(chunks))
+        self._bump_version(index)
         
         print(f"Successfully added {len(chunks)} chunks to vector store")
     
-    def similarity_search(self, query: str, k: int = None) -> List[Dict]:
-        """Search for similar documents."""
+    def rebuild(self, chunks: List[Dict[str, str]], progress: Callable[[int, int], None] = None) -> str:
+        """Build a fresh collection from chunks beside the live one, then atomically swap it in.
+        
+        Queries keep hitting the old collection until the new one is complete. The
+        previous collection is kept for sessions still reading it and dropped on the
+        next rebuild. Returns the new collection name.
+        """
+        name = f"{self.collection_name}__v{time.strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:4]}"
+        shadow = self._open_index(name)
+        self.add_documents(chunks, index=shadow, progress=progress)
+        
+        previous = self._live()
+        with self._swap_lock:
+            self._write_pointer(name)
+            self._pointer_mtime = self._get_pointer_mtime()
+            self.index = shadow
+        print(f"Swapped live collection: {previous.name} -> {name}")
+        
+        self._drop_stale_collections(keep={name, previous.name})
+        return name
+    
+    def _drop_stale_collections(self, keep):
+        shadow_prefix = f"{self.collection_name}__v"
+        for collection in self.client.list_collections():
+            # Newer Chroma versions return names, older ones return Collection objects
+            name = collection if isinstance(collection, str) else collection.name
+            if name in keep or not (name == self.collection_name or name.startswith(shadow_prefix)):
+                continue
+            try:
+                self.client.delete_collection(name=name)
+                ChunkStore(name).reset()
+                print(f"Dropped stale collection: {name}")
+            except Exception as e:
+                print(f"Warning: could not drop collection {name}: {str(e)}")
+    
+    def replace_source(self, source: str, chunks: List[Dict[str, str]]):
+        """Replace one PDF's chunks in the live collection.
+        
+        The new chunks go in before the old ones are removed, so if embedding
+        or Chroma fails part-way the PDF is still searchable.
+        """
+        index = self._live()
+        old_ids = set(index.collection.get(where={'source': source}, include=[])['ids'])
+        self.add_documents(chunks, index=index)
+        stale_ids = list(old_ids - {chunk['chunk_id'] for chunk in chunks})
+        if stale_ids:
+            index.collection.delete(ids=stale_ids)
+        self._bump_version(index)
+    
+    def delete_source(self, source: str):
+        """Remove every chunk of one PDF from the live collection.
+        
+        The text stays in the chunk store until the next full rebuild compacts it;
+        see get_dead_chunk_fraction.
+        """
+        index = self._live()
+        index.collection.delete(where={'source': source})
+        self._bump_version(index)
+    
+    @staticmethod
+    def build_filter(sources: List[str] = None, doc_types: List[str] = None) -> Optional[Dict]:
+        """Build a Chroma metadata filter restricting results to the given sources/document types."""
+        conditions = []
+        if sources:
+            conditions.append({'source': {'$in': list(sources)}})
+        if doc_types:
+            conditions.append({'doc_type': {'$in': list(doc_types)}})
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {'$and': conditions}
+    
+    def similarity_search(self, query: str, k: int = None, sources: List[str] = None,
+                          doc_types: List[str] = None) -> List[ChunkRecord]:
+        """Search for similar documents, optionally only within some sources or document types."""
         if k is None:
             k = Config.TOP_K_DOCUMENTS
         
         # Generate query embedding
         query_embedding = self.embeddings.encode([query])[0].tolist()
         
-        # Search in collection
-        results = self.collection.query(
+        # Search in collection; the metadata filter narrows candidates before vector scoring
+        index = self._live()
+        results = index.collection.query(
             query_embeddings=[query_embedding],
-            n_results=k
+            n_results=k,
+            where=self.build_filter(sources, doc_types),
+            include=['metadatas', 'distances']
         )
         
-        # Format results
-        documents = []
-        if results['documents'] and results['documents'][0]:
-            for i, doc in enumerate(results['documents'][0]):
-                documents.append({
-                    'content': doc,
-                    'metadata': results['metadatas'][0][i] if results['metadatas'] and results['metadatas'][0] else {},
-                    'distance': results['distances'][0][i] if results['distances'] and results['distances'][0] else 0
-                })
+        return self._to_records(index, results['ids'][0], results['metadatas'][0], results['distances'][0])
+    
+    def max_marginal_relevance_search(self, query: str, k: int = None, fetch_k: int = None,
+                                      lambda_mult: float = None, sources: List[str] = None,
+                                      doc_types: List[str] = None) -> List[ChunkRecord]:
+        """Over-fetch candidates, then pick a diverse top-k so overlapping chunks don't crowd the context."""
+        if k is None:
+            k = Config.TOP_K_DOCUMENTS
+        fetch_k = max(fetch_k or Config.MMR_FETCH_K, k)
+        lambda_mult = Config.MMR_LAMBDA if lambda_mult is None else lambda_mult
         
-        return documents
+        query_embedding = self.embeddings.encode([query])[0]
+        
+        index = self._live()
+        results = index.collection.query(
+            query_embeddings=[query_embedding.tolist()],
+            n_results=fetch_k,
+            where=self.build_filter(sources, doc_types),
+            include=['metadatas', 'distances', 'embeddings']
+        )
+        metadatas = results['metadatas'][0]
+        if not metadatas:
+            return []
+        
+        selected = maximal_marginal_relevance(query_embedding, results['embeddings'][0], k, lambda_mult)
+        return self._to_records(
+            index,
+            [results['ids'][0][i] for i in selected],
+            [metadatas[i] for i in selected],
+            [results['distances'][0][i] for i in selected]
+        )
+    
+    def search(self, query: str, k: int = None, sources: List[str] = None,
+               doc_types: List[str] = None) -> List[ChunkRecord]:
+        """Retrieve context for a question using the configured retrieval mode."""
+        if Config.RETRIEVAL_MODE == "mmr":
+            return self.max_marginal_relevance_search(query, k, sources=sources, doc_types=doc_types)
+        return self.similarity_search(query, k, sources=sources, doc_types=doc_types)
+    
+    def _to_records(self, index: LiveIndex, ids: List[str], metadatas: List[Dict],
+                    distances: List[float]) -> List[ChunkRecord]:
+        """Materialize text for the final results only."""
+        metadatas = [metadata or {} for metadata in metadatas]
+        
+        # Chunks added before the chunk store existed keep their text in Chroma; a
+        # collection can mix both once new PDFs are added, so fetch just those
+        legacy_ids = [ids[i] for i, metadata in enumerate(metadatas) if metadata.get('row') is None]
+        documents = {}
+        if legacy_ids:
+            legacy = index.collection.get(ids=legacy_ids, include=['documents'])
+            documents = dict(zip(legacy['ids'], legacy['documents']))
+        
+        records = []
+        for chunk_id, metadata, distance in zip(ids, metadatas, distances):
+            row = metadata.get('row')
+            if row is not None:
+                content = index.chunks.get_text(row)
+                source = index.chunks.get_source(row)
+            else:
+                content = documents.get(chunk_id) or ""
+                source = metadata.get('source', 'Unknown')
+            records.append(ChunkRecord(row, content, source, metadata, distance))
+        return records
+    
+    def get_filter_options(self) -> Dict[str, List[str]]:
+        """Get the sources and document types present in the collection, for scoping questions."""
+        index = self._live()
+        if self._filter_options is None or self._filter_options[0] != index.version:
+            metadatas = index.collection.get(include=['metadatas'])['metadatas'] or []
+            options = {
+                'sources': sorted({m['source'] for m in metadatas if m.get('source')}),
+                'doc_types': sorted({m['doc_type'] for m in metadatas if m.get('doc_type')})
+            }
+            self._filter_options = (index.version, options)
+        return self._filter_options[1]
+    
+    def get_dead_chunk_fraction(self) -> float:
+        """Get the share of chunk-store rows no longer referenced by the collection.
+        
+        Each collection entry points at one row, so rows beyond the entry count
+        were left behind by replaced or deleted PDFs.
+        """
+        index = self._live()
+        total = len(index.chunks)
+        if not total:
+            return 0.0
+        return max(0, total - index.collection.count()) / total
+    
+    def get_version(self) -> str:
+        """Get an identifier that changes whenever the knowledge base is modified."""
+        return self._live().version
     
     def get_collection_count(self) -> int:
         """Get the number of documents in the collection."""
-        return self.collection.count()
+        return self._live().collection.count()
     
     def reset_collection(self):
         """Reset the collection (delete all documents)."""
-        self.client.delete_collection(name=self.collection_name)
-        self.collection = self.client.create_collection(name=self.collection_name)
-        print(f"Reset collection: {self.collection_name}")
\ No newline at end of file
+        index = self._live()
+        self.client.delete_collection(name=index.name)
+        index.collection = self.client.create_collection(name=index.name)
+        index.chunks.reset()
+        self._bump_version(index)
+        print(f"Reset collection: {index.name}")
\ No newline at end of file